@@ -0,0 +1,120 @@
+import argparse
+
+import pandas as pd
+
+from store import MISSION_STATS_COLUMNS, RETRY_STEPS
+
+
+# Parcours d'apprentissage : les statistiques par (scénario, mission) du stockage local (store.MISSION_STATS,
+# tenues à jour à chaque synchronisation) sont jointes aux métadonnées des niveaux (blocs autorisés,
+# carte, pièces) pour suivre difficulté, abandons et relances mission par mission, dans l'ordre de jeu
+# des niveaux (Position, rang dans le scénario d'après l'index).
+
+LEVEL_COLUMNS = ["Position", "Blocks", "Limited Blocks", "Block Budget", "Map Cells", "Coins", "Guards", "Execution Limit"]
+CURVE_COLUMNS = [
+    "Scenario", "Mission Level", "Learners", "Completion Rate", "Three Stars Rate", "Drop-off Rate",
+    "Tries per Learner", "Mean Score", "Mean Time (min)",
+] + LEVEL_COLUMNS
+
+# étapes des tunnels, en pourcentage des apprenants ayant ouvert la mission
+FUNNEL_STAGES = {
+    "Learners": "Ouverte",
+    **{f"Tries {step}+": f"{step}+ essai" + ("s" if step > 1 else "") for step in RETRY_STEPS},
+    "Completed Learners": "Réussie",
+    "Two Stars Learners": "★ ★",
+    "Three Stars Learners": "★ ★ ★",
+}
+
+
+def level_features(index):
+    # (Scenario, Mission Level) -> structure du niveau, à partir de level_index.load_index()
+    # blockLimits : -1 = bloc illimité, 0 = bloc absent, n > 0 = au plus n blocs
+    records = []
+    for scenario, missions in index["levels"].items():
+        for mission, metadata in missions.items():
+            # niveau sans .xml (ajouté par level_overrides.json) : structure inconnue
+            if "map" not in metadata:
+                records.append((scenario, mission, metadata.get("position")) + (None,) * (len(LEVEL_COLUMNS) - 1))
+                continue
+            limits = list(metadata["blockLimits"].values())
+            records.append((
+                scenario, mission, metadata.get("position"),
+                sum(limit != 0 for limit in limits),
+                sum(limit > 0 for limit in limits),
+                sum(limit for limit in limits if limit > 0) or None,
+                metadata["map"]["height"] * metadata["map"]["width"],
+                len(metadata["coins"]),
+                metadata["guards"],
+                metadata.get("executionLimit"),
+            ))
+    features = pd.DataFrame.from_records(records, columns=["Scenario", "Mission Level"] + LEVEL_COLUMNS)
+    features[LEVEL_COLUMNS] = features[LEVEL_COLUMNS].astype("float64")
+    return features.set_index(["Scenario", "Mission Level"]).sort_index()
+
+
+def rate(count, total, digits=1):
+    return (count / total.where(total > 0) * 100).round(digits)
+
+
+def difficulty_curve(stats, features):
+    # une ligne par (scénario, mission) dans l'ordre des missions ; stats = StatementStore.mission_stats(),
+    # features = level_features(index) (NaN pour un niveau absent de l'index)
+    stats = stats[MISSION_STATS_COLUMNS]
+    curve = stats[["Scenario", "Mission Level", "Learners"]].copy()
+    curve["Completion Rate"] = rate(stats["Completed Learners"], stats["Learners"])
+    curve["Three Stars Rate"] = rate(stats["Three Stars Learners"], stats["Learners"])
+    curve["Drop-off Rate"] = rate(stats["Dropped Learners"], stats["Learners"])
+    curve["Tries per Learner"] = (stats["Tries"] / stats["Learners"].where(stats["Learners"] > 0)).round(2)
+    curve["Mean Score"] = (stats["Score Sum"] / stats["Scored Learners"].where(stats["Scored Learners"] > 0)).round(1)
+    curve["Mean Time (min)"] = (stats["Time Spent (min)"] / stats["Timed Learners"].where(stats["Timed Learners"] > 0)).round(1)
+    keys = pd.MultiIndex.from_frame(curve[["Scenario", "Mission Level"]])
+    level = features[LEVEL_COLUMNS].reindex(keys)
+    level.index = curve.index
+    counts = ["Position", "Blocks", "Limited Blocks", "Map Cells", "Coins", "Guards"]
+    curve = pd.concat([curve, level.astype({column: "Int64" for column in counts})], axis=1)
+    # niveaux hors index en fin de scénario, par nom
+    return curve.sort_values(["Scenario", "Position", "Mission Level"], ignore_index=True)[CURVE_COLUMNS]
+
+
+def funnel(curve, stats, scenario):
+    # étapes (lignes) x missions (colonnes) d'un scénario, en % des apprenants ayant ouvert la mission ;
+    # missions dans l'ordre de la courbe (difficulty_curve)
+    missions = curve.loc[curve["Scenario"] == scenario, "Mission Level"]
+    stats = stats[stats["Scenario"] == scenario].set_index("Mission Level").reindex(missions)
+    table = pd.DataFrame({label: rate(stats[column], stats["Learners"]) for column, label in FUNNEL_STAGES.items()})
+    table.index = missions.tolist()
+    return table.T
+
+
+def completion_heatmap(curve, column="Completion Rate"):
+    # scénarios (lignes) x missions (colonnes), missions dans l'ordre de leur rang puis de leur nom
+    order = curve.sort_values(["Position", "Mission Level"])["Mission Level"].drop_duplicates()
+    return curve.pivot(index="Scenario", columns="Mission Level", values=column)[order.tolist()]
+
+
+def learning_path(stats, features, scenario):
+    # tableaux affichés par la vue parcours (voir figures.learning_path_figures)
+    curve = difficulty_curve(stats, features)
+    return {
+        "scenario": scenario,
+        "curve": curve[curve["Scenario"] == scenario].reset_index(drop=True),
+        "funnel": funnel(curve, stats, scenario),
+        "completion": completion_heatmap(curve),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Difficulté, abandons et relances par mission (stockage local)")
+    parser.add_argument("--store", help="fichier SQLite du stockage local (défaut : DASHBOARD_STORE)")
+    parser.add_argument("--scenario", help="un seul scénario")
+    args = parser.parse_args()
+
+    from level_index import load_index
+    from normalization import threshold_table
+    from store import STORE_PATH, StatementStore
+
+    index = load_index()
+    store = StatementStore(args.store or STORE_PATH, thresholds=threshold_table(index))
+    stats = store.mission_stats(scenarios=[args.scenario] if args.scenario else None)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(difficulty_curve(stats, level_features(index)).to_string(index=False))
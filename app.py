@@ -1,515 +1,460 @@
-import requests
-import pandas as pd
-import dash
-from dash import dcc, html, dash_table
-from dash.dependencies import Input, Output, State
-import plotly.express as px
+import logging
+import os
 import warnings
-import plotly.graph_objects as go
+
+import dash
+from dash import DiskcacheManager, dcc, html, dash_table
+from dash.dependencies import ClientsideFunction, Input, Output, State
+
+from metrics import register_route, span, timed
+from services import DEFAULT_CONFIG, Services
+from views import SCORE_PAGE_SIZE, score_table_page
 
 
 warnings.filterwarnings("ignore", message=".*NotOpenSSLWarning.*")
 
-from score import extract_scores
-scores_max = extract_scores("Levels")
-scores_max["Infiltration"]["mission08"] = 3976 # pas de valeur dans le .xml donc obligé de le faire à la main
-
-
-def fetch_lrs_data(identifier):
-    endpoint = "https://lrsels.lip6.fr/data/xAPI/statements"
-    headers = {"X-Experience-API-Version": "1.0.3"}
-    auth = ("9fe9fa9a494f2b34b3cf355dcf20219d7be35b14", "b547a66817be9c2dbad2a5f583e704397c9db809")
-    params = {"agent": f'{{"account": {{"homePage": "https://www.lip6.fr/mocah/", "name": "{identifier}"}}}}', "limit": 500}
-    response = requests.get(endpoint, headers=headers, auth=auth, params=params)
-    if response.status_code == 200:
-        return response.json()["statements"]
-    else:
-        raise Exception(f"Error fetching data: {response.status_code}, {response.text}")
-
-def process_data(data):
-    records = []
-    last_mission_level = None
-    all_mission_levels = set()
-    completed_counts = {}
-    score_by_level = {}
-
-    for statement in data:
-        try:
-            success = statement.get("result", {}).get("success", False)
-            score = statement.get("result", {}).get("extensions", {}).get("https://spy.lip6.fr/xapi/extensions/score", None)
-
-            if not success:
-                score = 0
-
-            if score:
-                if isinstance(score, list) and len(score) > 0:
-                    score = score[0]
-
-                if isinstance(score, str):
-                    score = float(score)
-
-                if isinstance(score, (int, float)):
-                    score = float(score)
-                else:
-                    score = None
-            else:
-                score = None
-
-            mission_level = None
-            scenario = None
-            if "object" in statement:
-                object_data = statement["object"]
-                if "definition" in object_data:
-                    definition = object_data["definition"]
-                    if "extensions" in definition:
-                        extensions = definition["extensions"]
-                        if "https://w3id.org/xapi/seriousgames/extensions/progress" in extensions:
-                            mission_level = extensions["https://w3id.org/xapi/seriousgames/extensions/progress"][0]
-                        if "https://spy.lip6.fr/xapi/extensions/context" in extensions:
-                            scenario = extensions["https://spy.lip6.fr/xapi/extensions/context"][0]
-
-            if mission_level is None and last_mission_level is not None:
-                mission_level = last_mission_level
-
-            if mission_level is not None:
-                last_mission_level = mission_level
-                all_mission_levels.add(mission_level)
-
-                verb = statement["verb"]["id"].split("/")[-1]
-                if verb == "completed":
-                    if mission_level not in completed_counts:
-                        completed_counts[mission_level] = 0
-                    completed_counts[mission_level] += 1
-
-                if mission_level not in score_by_level:
-                    score_by_level[mission_level] = []
-                if score is not None:
-                    score_by_level[mission_level].append(score)
-
-            records.append({
-                "Timestamp": statement.get("timestamp"),
-                "Verb": statement["verb"]["id"].split("/")[-1],
-                "Actor": statement["actor"].get("name", "Unknown"),
-                "Object": statement["object"].get("id", "Unknown"),
-                "Score": score,
-                "Mission Level": mission_level,
-                "Scenario": scenario
-            })
-        except Exception as e:
-            continue
-
-        avg_score_by_level = {
-            level: round(sum(scores) / len(scores)) if len(scores) > 0 else None
-            for level, scores in score_by_level.items()
-        }
-
-
-    df = pd.DataFrame(records)
-    df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-    return df, list(all_mission_levels), completed_counts, avg_score_by_level, score_by_level
-
-def calculate_time_per_level(df):
-    if df["Mission Level"].isnull().all():
-        print("Aucun niveau détecté dans les données.")
-        return pd.DataFrame(columns=["Mission Level", "Time Spent (min)"])
-
-    # trier par niveau et timestamp
-    df = df.sort_values(by=["Mission Level", "Timestamp"])
-
-    # calculer les durées par sessions
-    session_times = []
-    for level, group in df.groupby("Mission Level"):
-        group = group.reset_index(drop=True)
-        time_diffs = group["Timestamp"].diff().dt.total_seconds() / 60  # différences en minutes
-        time_diffs = time_diffs.fillna(0)  # Remplir les NaN pour la première ligne
-        total_time = time_diffs[time_diffs <= 60].sum()  # on ignore les écarts > 60 minutes
-        session_times.append({"Mission Level": level, "Time Spent (min)": round(total_time, 2)})
-
-    time_spent = pd.DataFrame(session_times)
-
-    # on filtre les anomalies (exemple : sessions > 24 heures)
-    threshold = 24 * 60
-    anomalies = time_spent[time_spent["Time Spent (min)"] > threshold]
-    if not anomalies.empty:
-        print("Anomalies détectées :")
-        print(anomalies)
-        time_spent = time_spent[time_spent["Time Spent (min)"] <= threshold]
-
-    return time_spent
-
-
-
-def prepare_score_data(avg_score_by_level, all_levels):
-    scores_with_zeros = {level: avg_score_by_level.get(level, 0) for level in all_levels}
-    sorted_scores = dict(sorted(scores_with_zeros.items(), key=lambda item: item[0]))
-    return sorted_scores
-
-
-app = dash.Dash(__name__, suppress_callback_exceptions=True)
-app.title = "Tableau de bord avec vue alternée"
-
-app.layout = html.Div(id="app-container", children=[
-    dcc.Location(id='url', refresh=False),
-
-    # Login Page
-    html.Div([
-        html.Label("Bienvenue sur ton tableau de bord !", className="login-title"),
-        dcc.Input(id='input-identifier', type='text', placeholder='Entre ton code SPY (ex : A64881E9)', className="login-input"),
-        html.Button("Accéder à ta progression", id='login-button', n_clicks=0, className="login-button"),
-        html.Div(id='login-error', style={'color': 'red'}),
-    ], id='login-page', style={'display': 'block', 'textAlign': 'center'}),
-
-    # Dashboard Page
-    html.Div([
+logger = logging.getLogger(__name__)
+
+
+def build_layout():
+    return html.Div(id="app-container", children=[
+        dcc.Location(id='url', refresh=False),
+        # données de l'apprenant connecté (figures, vues du tableau par mission) : les changements de vue
+        # et de mission sont rendus dans le navigateur sans requête au serveur
+        dcc.Store(id='learner-data'),
+        # identifiant à synchroniser avec le LRS : seules les connexions absentes du cache passent par
+        # la tâche de fond
+        dcc.Store(id='login-sync'),
+
+        # Login Page
+        html.Div([
+            html.Label("Bienvenue sur ton tableau de bord !", className="login-title"),
+            dcc.Input(id='input-identifier', type='text', placeholder='Entre ton code SPY (ex : A64881E9)', className="login-input"),
+            html.Button("Accéder à ta progression", id='login-button', n_clicks=0, className="login-button"),
+            html.Div(id='login-error', style={'color': 'red'}),
+            html.Div(id='login-progress', className="login-progress"),
+            html.Button("Annuler", id='cancel-login-button', n_clicks=0, className="logout-button", style={'display': 'none'}),
+            dcc.Textarea(id='input-cohort', placeholder='Enseignant : colle les codes SPY de ta classe (un par ligne)', className="cohort-input"),
+            html.Button("Voir la classe", id='cohort-button', n_clicks=0, className="login-button"),
+            html.Div(id='cohort-progress', className="login-progress"),
+        ], id='login-page', style={'display': 'block', 'textAlign': 'center'}),
+
+        # Cohort Page
         html.Div([
-            html.Button("Déconnexion", id='logout-button', n_clicks=0, className="logout-button"),
-            html.Button("Basculer la vue", id='toggle-view-button', n_clicks=0, className="toggle-view-button"),
-            html.H1("Tableau de bord", className='dashboard-title'),
-        ]),
-        html.Div(id='graphs-view', style={'display': 'block'}),
+            html.Div([
+                html.Button("Retour", id='cohort-back-button', n_clicks=0, className="logout-button"),
+                html.H1("Tableau de bord de la classe", className='dashboard-title'),
+            ]),
+            html.Div(id='cohort-view'),
+
+            # parcours d'apprentissage : statistiques par mission de la classe ou de tous les apprenants
+            # du stockage local, relues à chaque changement de portée ou de scénario
+            dcc.Store(id='cohort-learners'),
+            html.Div([
+                html.H2("Parcours d'apprentissage", className='dashboard-mission-title'),
+                dcc.RadioItems(
+                    id='path-scope',
+                    options=[{'label': "La classe", 'value': 'class'}, {'label': "Tous les apprenants", 'value': 'all'}],
+                    value='class',
+                    inline=True,
+                ),
+                dcc.Dropdown(id='path-scenario', placeholder="Choisir un scénario", options=[], clearable=False),
+                html.Div(id='path-view'),
+            ], id='path-section'),
+        ], id='cohort-page', style={'display': 'none'}),
+
+        # Dashboard Page
         html.Div([
-            html.H2("Analyse ta progression sur chaque niveau.", className='dashboard-mission-title'),
-            dcc.Dropdown(
-                id='mission-filter',
-                placeholder="Filtrer par mission",
-                options=[],
-                multi=False,
-            ),
-            html.Div(id='table-view-content')
-        ], id='table-view', style={'display': 'none'}),
-    ], id='dashboard-page', style={'display': 'none'}),
-
-
-html.Label("© SU | ISG 2025 - Projet réalisé par Aans TAHIR, Kim SAIDI, Maéva DORMANT & Saad MOUSSTAID.", className='footer'),
-
-])
-
-
-@app.callback(
-    [
-        Output('login-page', 'style'),
-        Output('dashboard-page', 'style'),
-        Output('login-error', 'children'),
-        Output('graphs-view', 'children'),
-        Output('mission-filter', 'options')
-    ],
-    [Input('login-button', 'n_clicks'), Input('logout-button', 'n_clicks')],
-    [State('input-identifier', 'value')]
-)
-def manage_login(n_login, n_logout, identifier):
-    ctx = dash.callback_context
-    if not ctx.triggered:
-        return {'display': 'block'}, {'display': 'none'}, '', '', []
-
-    if ctx.triggered[0]['prop_id'].startswith('login-button'):
-        if identifier and identifier.strip():
-            try:
-                data = fetch_lrs_data(identifier)
-                df, mission_levels, completed_counts, avg_score_by_level, score_by_level = process_data(data)
-
-                # remise à niveau de tout les scores
-                for mission, score in avg_score_by_level.items():
-                    for niveau, score_max in scores_max["Infiltration"].items():
-                        if mission == niveau:
-                           
-                            if score == None:
-                                avg_score_by_level[mission] = 0
-                            elif score > score_max:
-                                avg_score_by_level[mission] = 100
-                            else :
-                               
-                                avg_score_by_level[mission] = round((score / score_max) * 100, 1) 
-                            
-                
-                time_spent = calculate_time_per_level(df)
-                time_spent_dict = time_spent.set_index("Mission Level")["Time Spent (min)"].to_dict()
-                df["Time Spent (min)"] = df["Mission Level"].map(time_spent_dict)
-
-                df["Nombre d'essai"] = df["Mission Level"].map(lambda x: len(score_by_level.get(x, [])))
-
-                sorted_scores = prepare_score_data({level: (score if score is not None else 0) for level, score in avg_score_by_level.items()}, mission_levels)
-
-                mission_levels = sorted(mission_levels)
-
-                
-                # Graphique pour l'évolution des scores
-                sorted_scores_df = pd.DataFrame({
-                    "Mission Level": list(sorted_scores.keys()),
-                    "Average Score": [round(value, 2) for value in sorted_scores.values()]
-                }).sort_values(by="Mission Level")
-
-                fig_score_evolution = px.line(
-                    sorted_scores_df,
-                    x="Mission Level",
-                    y="Average Score",
-                    title="Évolution des scores par niveau de mission",
-                    labels={"Mission Level": "Niveau de Mission", "Average Score": "Score Moyen (%)"},
-                    markers=True,
-                    template="seaborn"
-                )
-                fig_score_evolution.update_layout(yaxis_tickformat=".1f%%", yaxis=dict(range=[0, 105]))
-
-                # Graphique pour le nombre d'essais
-                attempts_data = pd.DataFrame({
-                    "Mission Level": list(score_by_level.keys()),
-                    "Nombre d'essai": [len(scores) for scores in score_by_level.values()]
-                }).sort_values(by="Mission Level")
-                fig_attempts = px.bar(
-                    attempts_data,
-                    x="Nombre d'essai",
-                    y="Mission Level",
-                    orientation='h',
-                    title="Nombre d'essais par niveau",
-                    labels={"Mission Level": "Niveau de Mission", "Nombre d'essai": "Nombre d'Essais"},
-                    color="Nombre d'essai",
-                    color_continuous_scale="Burg"
-                    
-                )
-
-                # trier les missions par ordre de mission
-                time_spent_sorted = time_spent.sort_values(by="Mission Level")  # Tri par Mission Level (ordre croissant)
-
-                # un graphique en barres horizontales
-                fig_time_spent = px.bar(
-                    time_spent_sorted,
-                    x="Time Spent (min)",
-                    y="Mission Level",
-                    orientation='h',
-                    title="Temps passé par niveau",
-                    labels={"Mission Level": "Niveau de Mission", "Time Spent (min)": "Temps Passé (min)"},
-                    color="Time Spent (min)",
-                    color_continuous_scale="Blugrn"  
-                )
-
-                
-                fig_time_spent.update_layout(
-                    yaxis=dict(categoryorder="array", categoryarray=time_spent_sorted["Mission Level"]),
-                    template="seaborn"  
-                )
-
-                
-                graphs = html.Div([
+            html.Div([
+                html.Button("Déconnexion", id='logout-button', n_clicks=0, className="logout-button"),
+                html.Button("Basculer la vue", id='toggle-view-button', n_clicks=0, className="toggle-view-button"),
+                html.H1("Tableau de bord", className='dashboard-title'),
+            ]),
+            html.Div([
+                html.Div([
+                    html.Div("Évolution des scores par niveau de mission", className="graph-title"),
+                    dcc.Graph(id='score-evolution')
+                ], className="graph-container"),
+
+                html.Div([
+                    html.Div("Nombre d'essais par niveau", className="graph-title"),
+                    dcc.Graph(id='attempts-graph')
+                ], className="graph-container"),
+
+                html.Div([
+                    html.Div("Temps passé par niveau", className="graph-title"),
+                    dcc.Graph(id='time-spent-graph')
+                ], className="graph-container"),
+            ], id='graphs-view', style={'display': 'block'}),
+            html.Div([
+                html.H2("Analyse ta progression sur chaque niveau.", className='dashboard-mission-title'),
+                dcc.Dropdown(
+                    id='mission-filter',
+                    placeholder="Filtrer par mission",
+                    options=[],
+                    multi=False,
+                ),
+                html.Div([
+                    html.Div(dash_table.DataTable(
+                        id='stats-table',
+                        columns=[
+                            {"name": "Score le plus haut", "id": "Score le plus haut"},
+                            {"name": "Score Moyen", "id": "Score Moyen"},
+                            {"name": "Score le plus bas obtenu", "id": "Score le plus bas obtenu"}
+                        ],
+                        data=[],
+                        style_table={'height': '100%', 'overflowY': 'auto', 'margin': '10px', 'align-items': 'center'},
+                        style_cell={'textAlign': 'center', 'font-size': '16px'},
+                        style_data_conditional=[
+                            {
+                                'if': {'column_id': 'Score le plus haut'},
+                                'backgroundColor': '#28a745', 
+                                'color': 'white'  
+                            },
+                            {
+                                'if': {'column_id': 'Score le plus bas obtenu'},
+                                'backgroundColor': 'red',  
+                                'color': 'white'  
+                            }
+                        ]
+                    ), className="table-container"),
+                    html.Div(dash_table.DataTable(
+                        id='score-table',
+                        columns=[
+                            {"name": "Essai", "id": "Essai"},
+                            {"name": "Score", "id": "Score"},
+                            {"name": "Feedback", "id": "Feedback"}
+                        ],
+                        data=[],
+                        # pages et tri servis par page_score_table
+                        page_action='custom',
+                        page_current=0,
+                        page_size=SCORE_PAGE_SIZE,
+                        page_count=1,
+                        sort_action='custom',
+                        sort_mode='single',
+                        sort_by=[],
+                        style_table={'height': '100%', 'overflowY': 'auto', 'margin': '10px', 'align-items': 'center'},
+                        style_cell={'textAlign': 'center', 'font-size': '16px'}
+                    ), className="table-container"),
+
+                    # feedback du penguin
                     html.Div([
-                        html.Div("Évolution des scores par niveau de mission", className="graph-title"),
-                        dcc.Graph(id='score-evolution', figure=fig_score_evolution)
-                    ], className="graph-container"),
+                        html.Img(
+                            id='penguin-image',
+                            src="/assets/penguin_idle.png",
+                            style={
+                                "width": "350px", 
+                                "margin-right": "20px",  
+                            }
+                        ),
+
+                        # feedback
+                        html.Div(
+                            id='penguin-comment',
+                            style={
+                                "text-align": "center",
+                                "font-size": "24px",  
+                                "font-weight": "bold",
+                                "color": "#ffffff",
+                                "background-color": "#005656",
+                                "padding": "20px",  
+                                "border-radius": "15px",  
+                                "width": "fit-content",
+                                "border": "3px solid #ffffff", 
+                            }
+                        )
+                    ], style={
+                        "display": "flex",
+                        "align-items": "center", 
+                        "justify-content": "flex-start",  
+                        "gap": "20px",  
+                        "margin-top": "10px"  
+                    }),
+                ], id='table-view-content')
+            ], id='table-view', style={'display': 'none'}),
+        ], id='dashboard-page', style={'display': 'none'}),
+
+
+    html.Label("© SU | ISG 2025 - Projet réalisé par Aans TAHIR, Kim SAIDI, Maéva DORMANT & Saad MOUSSTAID.", className='footer'),
+
+    ])
+
+
+def register_callbacks(app, services):
+    def login_result(identifier, aggregates, set_progress=None):
+        if aggregates.empty:
+            raise ValueError("Aucun statement pour cet identifiant")
+        if set_progress:
+            set_progress("Construction des graphiques…")
+        learner_data = services.learner_data(identifier, aggregates)
+        return {'display': 'none'}, {'display': 'block'}, '', learner_data
+
+    def login_refused(identifier):
+        logger.warning("Connexion refusée", exc_info=True, extra={"fields": {"learner": identifier}})
+        return {'display': 'block'}, {'display': 'none'}, "Identifiant invalide.", None
+
+    @app.callback(
+        [
+            Output('login-page', 'style'),
+            Output('dashboard-page', 'style'),
+            Output('login-error', 'children'),
+            Output('learner-data', 'data'),
+            Output('login-sync', 'data')
+        ],
+        [Input('login-button', 'n_clicks')],
+        [State('input-identifier', 'value')],
+        prevent_initial_call=True
+    )
+    @timed("manage_login")
+    def manage_login(n_login, identifier):
+        if not identifier or not identifier.strip():
+            return {'display': 'block'}, {'display': 'none'}, "Veuillez entrer un identifiant.", None, dash.no_update
+
+        # apprenant en cache : réponse directe, sans démarrer de processus de fond
+        identifier = identifier.strip()
+        try:
+            aggregates = services.cached_learner_aggregates(identifier)
+            if aggregates is None:
+                return (dash.no_update,) * 2 + ('', dash.no_update, {'identifier': identifier, 'n_clicks': n_login})
+            return login_result(identifier, aggregates) + (dash.no_update,)
+        except Exception:
+            return login_refused(identifier) + (dash.no_update,)
+
+    @app.callback(
+        [
+            Output('login-page', 'style', allow_duplicate=True),
+            Output('dashboard-page', 'style', allow_duplicate=True),
+            Output('login-error', 'children', allow_duplicate=True),
+            Output('learner-data', 'data', allow_duplicate=True)
+        ],
+        [Input('login-sync', 'data')],
+        background=True,
+        progress=Output('login-progress', 'children'),
+        progress_default='',
+        running=[
+            (Output('login-button', 'disabled'), True, False),
+            (Output('cancel-login-button', 'style'), {'display': 'inline-block'}, {'display': 'none'}),
+        ],
+        # la déconnexion (ou le bouton Annuler) arrête la synchronisation en cours
+        cancel=[Input('logout-button', 'n_clicks'), Input('cancel-login-button', 'n_clicks')],
+        interval=250,
+        prevent_initial_call=True
+    )
+    @timed("sync_login")
+    def sync_login(set_progress, sync):
+        identifier = sync['identifier']
+        try:
+            # synchronisation LRS puis agrégats (apprenant, scénario, mission) du stockage local
+            aggregates = services.sync_learner_aggregates(identifier, set_progress)
+            return login_result(identifier, aggregates, set_progress)
+        except Exception:
+            return login_refused(identifier)
+
+
+    # changements d'état de l'interface (déconnexion, vue, mission) : rendus par assets/dashboard.js
+    app.clientside_callback(
+        ClientsideFunction(namespace='dashboard', function_name='logout'),
+        [
+            Output('login-page', 'style', allow_duplicate=True),
+            Output('dashboard-page', 'style', allow_duplicate=True),
+            Output('login-error', 'children', allow_duplicate=True),
+            Output('learner-data', 'data', allow_duplicate=True),
+            Output('mission-filter', 'value')
+        ],
+        [Input('logout-button', 'n_clicks')],
+        prevent_initial_call=True
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='dashboard', function_name='render_graphs'),
+        [
+            Output('score-evolution', 'figure'),
+            Output('attempts-graph', 'figure'),
+            Output('time-spent-graph', 'figure'),
+            Output('mission-filter', 'options')
+        ],
+        [Input('learner-data', 'data')]
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='dashboard', function_name='render_table'),
+        [
+            Output('stats-table', 'data'),
+            Output('score-table', 'data'),
+            Output('score-table', 'page_count'),
+            Output('score-table', 'page_current'),
+            Output('score-table', 'sort_by'),
+            Output('penguin-image', 'src'),
+            Output('penguin-comment', 'children')
+        ],
+        [Input('mission-filter', 'value'), Input('learner-data', 'data')],
+        [State('score-table', 'page_current'), State('score-table', 'sort_by')]
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='dashboard', function_name='toggle_view'),
+        [Output('graphs-view', 'style'), Output('table-view', 'style')],
+        [Input('toggle-view-button', 'n_clicks')]
+    )
+
+
+    # retour de la vue classe à la page de connexion : rendu par assets/dashboard.js
+    app.clientside_callback(
+        ClientsideFunction(namespace='dashboard', function_name='leave_cohort'),
+        [
+            Output('login-page', 'style', allow_duplicate=True),
+            Output('cohort-page', 'style', allow_duplicate=True),
+            Output('cohort-view', 'children', allow_duplicate=True),
+            Output('login-error', 'children', allow_duplicate=True)
+        ],
+        [Input('cohort-back-button', 'n_clicks')],
+        prevent_initial_call=True
+    )
+
+    @app.callback(
+        [
+            Output('login-page', 'style', allow_duplicate=True),
+            Output('cohort-page', 'style'),
+            Output('cohort-view', 'children'),
+            Output('login-error', 'children', allow_duplicate=True),
+            Output('cohort-learners', 'data'),
+            Output('path-scenario', 'options'),
+            Output('path-scenario', 'value'),
+        ],
+        [Input('cohort-button', 'n_clicks')],
+        [State('input-cohort', 'value')],
+        # une classe entière peut demander des centaines de pages au LRS : chargement en tâche de fond
+        background=True,
+        progress=Output('cohort-progress', 'children'),
+        progress_default='',
+        running=[(Output('cohort-button', 'disabled'), True, False)],
+        interval=250,
+        prevent_initial_call=True
+    )
+    @timed("manage_cohort")
+    def manage_cohort(set_progress, n_cohort, codes):
+        from cohort import parse_identifiers, cohort_summary, cohort_figures
+
+        unchanged = (dash.no_update,) * 3
+        identifiers = parse_identifiers(codes)
+        if not identifiers:
+            return ({'display': 'block'}, {'display': 'none'}, '', "Veuillez entrer au moins un identifiant.") + unchanged
+
+        # pages LRS récupérées en parallèle, puis une seule analyse pour toute la classe (mise en cache
+        # apprenant par apprenant comme pour une connexion)
+        try:
+            aggregates, errors = services.load_cohort_aggregates(identifiers, set_progress)
+        except Exception:
+            logger.warning("Classe non chargée", exc_info=True, extra={"fields": {"learners": len(identifiers)}})
+            return ({'display': 'block'}, {'display': 'none'}, '', "Impossible de charger la classe.") + unchanged
+        if len(errors) == len(identifiers):
+            return ({'display': 'block'}, {'display': 'none'}, '', "Aucun identifiant valide.") + unchanged
+
+        set_progress("Construction des graphiques…")
+        summary = cohort_summary(aggregates)
+        children = [
+            html.Div(f"{len(identifiers) - len(errors)} apprenant(s) chargé(s).", className="graph-title"),
+        ]
+        if errors:
+            children.append(html.Div("Identifiants introuvables : " + ", ".join(errors), style={'color': 'red'}))
+        with span("figures", learners=len(identifiers)):
+            figures = cohort_figures(summary)
+        for title, fig in figures:
+            children.append(html.Div([
+                html.Div(title, className="graph-title"),
+                dcc.Graph(figure=fig)
+            ], className="graph-container"))
+
+        # la vue parcours s'ouvre sur le scénario par défaut s'il a été joué par la classe
+        learners = [identifier for identifier in identifiers if identifier not in errors]
+        scenarios = sorted(aggregates["Scenario"].dropna().unique())
+        scenario = services.config["scenario"] if services.config["scenario"] in scenarios else scenarios[0]
+        return {'display': 'none'}, {'display': 'block'}, children, '', learners, scenarios, scenario
+
+
+    @app.callback(
+        Output('path-view', 'children'),
+        [Input('cohort-learners', 'data'), Input('path-scope', 'value'), Input('path-scenario', 'value')],
+        prevent_initial_call=True
+    )
+    @timed("learning_path")
+    def learning_path(learners, scope, scenario):
+        if not learners or not scenario:
+            return []
+        figures = services.learning_path(scenario, learners if scope == 'class' else None)
+        return [
+            html.Div([
+                html.Div(title, className="graph-title"),
+                dcc.Graph(figure=fig)
+            ], className="graph-container")
+            for title, fig in figures
+        ]
+
+
+    @app.callback(
+        Output('score-table', 'data', allow_duplicate=True),
+        [Input('score-table', 'page_current'), Input('score-table', 'sort_by')],
+        [State('mission-filter', 'value'), State('input-identifier', 'value')],
+        prevent_initial_call=True
+    )
+    @timed("page_score_table")
+    def page_score_table(page_current, sort_by, selected_mission, identifier):
+        if not identifier:
+            return []
+        return score_table_page(services.load_score_rows(identifier.strip(), selected_mission), page_current, sort_by)
+
+
+class BackgroundCallbackManager(DiskcacheManager):
+    def terminate_job(self, job):
+        # le forkserver récupère aussitôt un job terminé : il peut disparaître pendant que Dash
+        # liste ses processus enfants
+        import psutil
+        try:
+            super().terminate_job(job)
+        except psutil.NoSuchProcess:
+            pass
 
-                    html.Div([
-                        html.Div("Nombre d'essais par niveau", className="graph-title"),
-                        dcc.Graph(id='attempts-graph', figure=fig_attempts)
-                    ], className="graph-container"),
 
-                    html.Div([
-                        html.Div("Temps passé par niveau", className="graph-title"),
-                        dcc.Graph(id='time-spent-graph', figure=fig_time_spent)
-                    ], className="graph-container"),
-                ])
-
-
-                # pour trier les niveaux
-               
-                options = [{'label': level, 'value': level} for level in mission_levels]
-
-                return {'display': 'none'}, {'display': 'block'}, '', graphs, options
-            except Exception as e:
-                return {'display': 'block'}, {'display': 'none'}, "Identifiant invalide.", '', []
-        else:
-            return {'display': 'block'}, {'display': 'none'}, "Veuillez entrer un identifiant.", '', []
-
-    if ctx.triggered[0]['prop_id'].startswith('logout-button'):
-        return {'display': 'block'}, {'display': 'none'}, '', '', []
-
-    return {'display': 'block'}, {'display': 'none'}, '', '', []
-
-
-
-def generate_feedback(score, max_score):
-    if score is None or max_score is None or max_score == 0:
-        return "☆ ☆ ☆"  # Pas de score ou score invalide
-    percentage = (score / max_score) * 100
-    if percentage >= 90:
-        return "★ ★ ★"
-    elif percentage >= 70:
-        return "★ ★ ☆"
-    else:
-        return "★ ☆ ☆"
-
-
-
-def get_penguin_feedback(score, max_score):
-    if score is None or max_score is None or max_score == 0:
-        return {
-            "comment": "Ne vous découragez pas, vous y arriverez ! 🐧",
-            "image": "/assets/penguin_sad.png"
-        }
-    percentage = (score / max_score) * 100
-    if percentage >= 90:
-        return {
-            "comment": "Excellent travail ! Vous êtes un expert ! 🐧",
-            "image": "/assets/penguin_happy.png"
-        }
-    elif percentage >= 70:
-        return {
-            "comment": "Bon travail, mais vous pouvez encore progresser ! 🐧",
-            "image": "/assets/penguin_neutral.png"
-        }
-    else:
-        return {
-            "comment": "Ne vous découragez pas, vous y arriverez ! 🐧",
-            "image": "/assets/penguin_sad.png"
-        }
-
-
-
-@app.callback(
-    Output('table-view-content', 'children'),
-    [Input('mission-filter', 'value')],
-    [State('input-identifier', 'value')]
-)
-def filter_table(selected_mission, identifier):
-    if not identifier:
-        return html.Div(["Aucune donnée disponible."], style={'display': 'block', 'color': 'white'})
-    try:
-        data = fetch_lrs_data(identifier)
-        df, _, _, _, score_by_level = process_data(data)
-        print("selected_mission :", selected_mission)
-        df = df[df['Score'].notna() & (df['Score'] != 0)]
-        df["Score"] = df["Score"].apply(lambda x: round(x, 2) if pd.notnull(x) else x)
-        df['Essai'] = df.groupby('Mission Level').cumcount() + 1
-
-        if selected_mission:
-            df = df[df["Mission Level"] == selected_mission]
-
-        # colonne Feedback
-        df["Feedback"] = df.apply(
-            lambda row: generate_feedback(row["Score"], scores_max["Infiltration"].get(row["Mission Level"], None)),
-            axis=1
-        )
-        score_table = dash_table.DataTable(
-            id='score-table',
-            columns=[
-                {"name": "Essai", "id": "Essai"},
-                {"name": "Score", "id": "Score"},
-                {"name": "Feedback", "id": "Feedback"}
-            ],
-            data=df.to_dict('records'),
-            style_table={'height': '100%', 'overflowY': 'auto', 'margin': '10px', 'align-items': 'center'},
-            style_cell={'textAlign': 'center', 'font-size': '16px'}
-        )
-
-       
-        if selected_mission:
-            mission_scores = df[df["Mission Level"] == selected_mission]["Score"]
-        else:
-            mission_scores = df["Score"]
-
-        stats_data = {
-            "Score le plus haut": (
-                scores_max["Infiltration"][selected_mission]
-                if selected_mission in scores_max["Infiltration"]
-                and mission_scores.max() is not None
-                and scores_max["Infiltration"][selected_mission] >= mission_scores.max()
-                else mission_scores.max()
-                if mission_scores.max() is not None
-                else None
-            ),
-            "Score Moyen": (
-                round(mission_scores.mean(), 2) if not mission_scores.empty else None
-            ),
-            "Score le plus bas obtenu": (
-                round(mission_scores.min(), 2) if not mission_scores.empty else None
-            )
-        }
-
-        # Tableau pour les statistiques
-        stats_table = dash_table.DataTable(
-            id='stats-table',
-            columns=[
-                {"name": "Score le plus haut", "id": "Score le plus haut"},
-                {"name": "Score Moyen", "id": "Score Moyen"},
-                {"name": "Score le plus bas obtenu", "id": "Score le plus bas obtenu"}
-            ],
-            data=[stats_data],
-            style_table={'height': '100%', 'overflowY': 'auto', 'margin': '10px', 'align-items': 'center'},
-            style_cell={'textAlign': 'center', 'font-size': '16px'},
-            style_data_conditional=[
-                {
-                    'if': {'column_id': 'Score le plus haut'},
-                    'backgroundColor': '#28a745', 
-                    'color': 'white'  
-                },
-                {
-                    'if': {'column_id': 'Score le plus bas obtenu'},
-                    'backgroundColor': 'red',  
-                    'color': 'white'  
-                }
-            ]
-        )
-
-        # feedback du penguin
-        if not df.empty:
-            recent_score = df["Score"].iloc[-1]  
-            max_score = scores_max["Infiltration"].get(df["Mission Level"].iloc[-1], None)
-            penguin_feedback_data = get_penguin_feedback(recent_score, max_score)
-        else:
-            penguin_feedback_data = {
-                "comment": "Aucun score disponible pour l'instant. Essayez une mission ! 🐧",
-                "image": "/assets/penguin_idle.png"
-            }
-
-        penguin_feedback = html.Div([
-            html.Img(
-                src=penguin_feedback_data["image"],
-                style={
-                    "width": "350px", 
-                    "margin-right": "20px",  
-                }
-            ),
-            
-            # feedback
-            html.Div(
-                penguin_feedback_data["comment"],
-                style={
-                    "text-align": "center",
-                    "font-size": "24px",  
-                    "font-weight": "bold",
-                    "color": "#ffffff",
-                    "background-color": "#005656",
-                    "padding": "20px",  
-                    "border-radius": "15px",  
-                    "width": "fit-content",
-                    "border": "3px solid #ffffff", 
-                }
-            )
-        ], style={
-            "display": "flex",
-            "align-items": "center", 
-            "justify-content": "flex-start",  
-            "gap": "20px",  
-            "margin-top": "10px"  
-        })
-
-        return html.Div([
-            html.Div(stats_table, className="table-container"),
-            html.Div(score_table, className="table-container"),
-            penguin_feedback
-        ])
-
-    except Exception as e:
-        print(f"Erreur lors de la récupération des données : {e}")
-        return html.Div("Erreur lors de la récupération des données.")
-
-    
-@app.callback(
-    [Output('graphs-view', 'style'), Output('table-view', 'style')],
-    [Input('toggle-view-button', 'n_clicks')]
-)
-def toggle_view(n_clicks):
-    if n_clicks % 2 == 0:
-        return {'display': 'block'}, {'display': 'none'}
-    else:
-        return {'display': 'none'}, {'display': 'block'}
+def create_app(config=None, lrs_client=None, level_index=None):
+    # config : voir services.DEFAULT_CONFIG (+ log_level) ; lrs_client et level_index peuvent être injectés.
+    # Rien de lourd ici : pandas, plotly, requests et l'index des niveaux sont chargés au premier usage.
+    config = {**DEFAULT_CONFIG, "log_level": os.environ.get("DASHBOARD_LOG_LEVEL", "INFO"), **(config or {})}
+    services = Services(config, lrs_client=lrs_client, level_index=level_index)
+    services.setup_process()
+    # cache ouvert dès le démarrage : un backend incompatible avec les callbacks de fond échoue ici
+    services.learner_cache
+
+    import diskcache
+    import multiprocess
+
+    # les jobs partent d'un processus neutre (forkserver) et non d'un fork du serveur : un fork pris
+    # pendant qu'un autre thread tient un verrou SQLite bloque le job pour toujours. Les modules lourds
+    # y sont chargés une fois, chaque job démarre avec pandas et plotly déjà importés.
+    if multiprocess.get_start_method(allow_none=True) is None:
+        multiprocess.set_start_method("forkserver")
+        multiprocess.set_forkserver_preload(["pandas", "plotly.graph_objects", "store", "figures", "views", "cohort"])
+
+    # callbacks longs (appels au LRS) exécutés hors des workers web, file d'attente dans .cache/background
+    background_callback_manager = BackgroundCallbackManager(
+        diskcache.Cache(os.path.join(config["cache_dir"], "background"))
+    )
+
+    app = dash.Dash(__name__, suppress_callback_exceptions=True, background_callback_manager=background_callback_manager)
+    app.title = "Tableau de bord avec vue alternée"
+    app.layout = build_layout()
+    app.services = services
+
+    # /metrics : latences (callbacks et étapes), taux de succès du cache et requêtes envoyées au LRS
+    register_route(app.server)
+    register_callbacks(app, services)
+    return app
+
+
+def create_server(config=None):
+    # point d'entrée WSGI, ex. gunicorn "app:create_server()"
+    return create_app(config).server
 
 
 if __name__ == '__main__':
-    app.run_server(debug=True)
\ No newline at end of file
+    create_app().run_server(debug=True)
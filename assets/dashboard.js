@@ -0,0 +1,53 @@
+// Callbacks exécutés dans le navigateur : ils ne font que changer l'affichage à partir des
+// données déjà chargées dans learner-data, sans requête au serveur.
+
+const EMPTY_FIGURE = {data: [], layout: {}};
+const SHOWN = {display: 'block'};
+const HIDDEN = {display: 'none'};
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    dashboard: {
+        logout: function (n_clicks) {
+            // retour à la page de connexion ; les données de l'apprenant sont oubliées
+            return [SHOWN, HIDDEN, '', null, null];
+        },
+
+        leave_cohort: function (n_clicks) {
+            // retour de la vue classe à la page de connexion
+            return [SHOWN, HIDDEN, '', ''];
+        },
+
+        toggle_view: function (n_clicks) {
+            if ((n_clicks || 0) % 2 === 0) {
+                return [SHOWN, HIDDEN];
+            }
+            return [HIDDEN, SHOWN];
+        },
+
+        render_graphs: function (data) {
+            if (!data) {
+                return [EMPTY_FIGURE, EMPTY_FIGURE, EMPTY_FIGURE, []];
+            }
+            const options = data.missions.map(function (level) {
+                return {label: level, value: level};
+            });
+            return data.figures.concat([options]);
+        },
+
+        render_table: function (mission, data, page_current, sort_by) {
+            const no_update = window.dash_clientside.no_update;
+            const view = data && data.tables[mission || ''];
+            // les pages suivantes et le tri restent servis par page_score_table : on ne revient
+            // à la première page (requête au serveur) que si une autre page était affichée
+            const page = page_current ? 0 : no_update;
+            const sort = sort_by && sort_by.length ? [] : no_update;
+            if (!view) {
+                return [[], [], 1, page, sort, '/assets/penguin_idle.png', 'Aucune donnée disponible.'];
+            }
+            return [
+                view.stats, view.scores, view.page_count, page, sort,
+                view.penguin.image, view.penguin.comment
+            ];
+        }
+    }
+});
@@ -0,0 +1,29 @@
+import argparse
+import time
+
+from benchmarks.legacy import process_data_legacy
+from benchmarks.synthetic import generate_statements
+from processing import process_data
+
+
+def best_of(function, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="process_data colonnaire vs implémentation historique")
+    parser.add_argument("--statements", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = generate_statements(args.statements)
+    legacy = best_of(process_data_legacy, data, args.repeat)
+    columnar = best_of(process_data, data, args.repeat)
+    print(f"{args.statements} statements")
+    print(f"  process_data_legacy : {legacy * 1000:8.1f} ms")
+    print(f"  process_data        : {columnar * 1000:8.1f} ms  (x{legacy / columnar:.1f})")
@@ -0,0 +1,30 @@
+import argparse
+import time
+
+from benchmarks.legacy import calculate_time_per_level_legacy
+from benchmarks.synthetic import generate_statements
+from processing import calculate_time_per_level, process_data
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="calculate_time_per_level : un apprenant puis une classe entière")
+    parser.add_argument("--statements", type=int, default=100_000)
+    parser.add_argument("--learners", type=int, default=1000)
+    args = parser.parse_args()
+
+    df = process_data(generate_statements(args.statements))[0]
+    legacy = timed(calculate_time_per_level_legacy, df)
+    grouped = timed(calculate_time_per_level, df)
+    print(f"{args.statements} statements, 1 apprenant")
+    print(f"  calculate_time_per_level_legacy : {legacy * 1000:8.1f} ms")
+    print(f"  calculate_time_per_level        : {grouped * 1000:8.1f} ms")
+
+    df = process_data(generate_statements(args.statements, learners=args.learners))[0]
+    cohort = timed(calculate_time_per_level, df, by=("Actor", "Mission Level"))
+    print(f"{args.statements} statements, {args.learners} apprenants en un appel : {cohort * 1000:8.1f} ms")
@@ -0,0 +1,63 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+
+# Budget de démarrage d'un worker : `import app; app.create_app()` mesuré avec python -X importtime
+# dans un processus neuf. Échoue si le temps total dépasse le budget ou si une dépendance lourde
+# (chargée normalement au premier usage) est importée au démarrage.
+#
+#   python -m benchmarks.importtime
+#   python -m benchmarks.importtime --budget-ms 800 --top 15
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP = "import app; app.create_app()"
+DEFERRED = ["pandas", "numpy", "plotly.express", "plotly.graph_objects", "requests",
+            "level_index", "normalization", "store", "processing", "figures", "cohort", "analytics", "lrs"]
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure(statement=STARTUP):
+    # [(module, self µs, cumulé µs, profondeur)] dans l'ordre de fin d'import
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return imports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Temps d'import au démarrage d'un worker")
+    parser.add_argument("--budget-ms", type=float, default=1200)
+    parser.add_argument("--top", type=int, default=5, help="nombre d'imports de premier niveau affichés")
+    args = parser.parse_args()
+
+    imports = measure()
+    total_ms = sum(self_us for _, self_us, _, _ in imports) / 1000
+    # importtime écrit les sous-modules avant leur parent : on regroupe sous chaque import de premier niveau
+    tree, children = [], []
+    for module, _, cumulative_us, depth in imports:
+        if depth == 1:
+            children.append((module, cumulative_us))
+        elif depth == 0:
+            tree.append((module, cumulative_us, sorted(children, key=lambda child: -child[1])))
+            children = []
+    for module, cumulative_us, heaviest in sorted(tree, key=lambda entry: -entry[1])[:args.top]:
+        print(f"{module:<40} {cumulative_us / 1000:9.1f} ms")
+        for child, child_us in heaviest[:3]:
+            print(f"  {child:<38} {child_us / 1000:9.1f} ms")
+    print(f"{'total':<40} {total_ms:9.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    loaded = {module for module, _, _, _ in imports}
+    eager = [module for module in DEFERRED if module in loaded]
+    if eager:
+        print("importés au démarrage alors qu'ils devraient être différés : " + ", ".join(eager))
+    sys.exit(1 if eager or total_ms > args.budget_ms else 0)
@@ -0,0 +1,116 @@
+import pandas as pd
+
+
+# Implémentations historiques de process_data et calculate_time_per_level (boucles Python),
+# conservée uniquement comme référence pour les benchmarks.
+def process_data_legacy(data):
+    records = []
+    last_mission_level = None
+    all_mission_levels = set()
+    completed_counts = {}
+    score_by_level = {}
+
+    for statement in data:
+        try:
+            success = statement.get("result", {}).get("success", False)
+            score = statement.get("result", {}).get("extensions", {}).get("https://spy.lip6.fr/xapi/extensions/score", None)
+
+            if not success:
+                score = 0
+
+            if score:
+                if isinstance(score, list) and len(score) > 0:
+                    score = score[0]
+
+                if isinstance(score, str):
+                    score = float(score)
+
+                if isinstance(score, (int, float)):
+                    score = float(score)
+                else:
+                    score = None
+            else:
+                score = None
+
+            mission_level = None
+            scenario = None
+            if "object" in statement:
+                object_data = statement["object"]
+                if "definition" in object_data:
+                    definition = object_data["definition"]
+                    if "extensions" in definition:
+                        extensions = definition["extensions"]
+                        if "https://w3id.org/xapi/seriousgames/extensions/progress" in extensions:
+                            mission_level = extensions["https://w3id.org/xapi/seriousgames/extensions/progress"][0]
+                        if "https://spy.lip6.fr/xapi/extensions/context" in extensions:
+                            scenario = extensions["https://spy.lip6.fr/xapi/extensions/context"][0]
+
+            if mission_level is None and last_mission_level is not None:
+                mission_level = last_mission_level
+
+            if mission_level is not None:
+                last_mission_level = mission_level
+                all_mission_levels.add(mission_level)
+
+                verb = statement["verb"]["id"].split("/")[-1]
+                if verb == "completed":
+                    if mission_level not in completed_counts:
+                        completed_counts[mission_level] = 0
+                    completed_counts[mission_level] += 1
+
+                if mission_level not in score_by_level:
+                    score_by_level[mission_level] = []
+                if score is not None:
+                    score_by_level[mission_level].append(score)
+
+            records.append({
+                "Timestamp": statement.get("timestamp"),
+                "Verb": statement["verb"]["id"].split("/")[-1],
+                "Actor": statement["actor"].get("name", "Unknown"),
+                "Object": statement["object"].get("id", "Unknown"),
+                "Score": score,
+                "Mission Level": mission_level,
+                "Scenario": scenario
+            })
+        except Exception as e:
+            continue
+
+        avg_score_by_level = {
+            level: round(sum(scores) / len(scores)) if len(scores) > 0 else None
+            for level, scores in score_by_level.items()
+        }
+
+
+    df = pd.DataFrame(records)
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+    return df, list(all_mission_levels), completed_counts, avg_score_by_level, score_by_level
+
+
+def calculate_time_per_level_legacy(df):
+    if df["Mission Level"].isnull().all():
+        print("Aucun niveau détecté dans les données.")
+        return pd.DataFrame(columns=["Mission Level", "Time Spent (min)"])
+
+    # trier par niveau et timestamp
+    df = df.sort_values(by=["Mission Level", "Timestamp"])
+
+    # calculer les durées par sessions
+    session_times = []
+    for level, group in df.groupby("Mission Level"):
+        group = group.reset_index(drop=True)
+        time_diffs = group["Timestamp"].diff().dt.total_seconds() / 60  # différences en minutes
+        time_diffs = time_diffs.fillna(0)  # Remplir les NaN pour la première ligne
+        total_time = time_diffs[time_diffs <= 60].sum()  # on ignore les écarts > 60 minutes
+        session_times.append({"Mission Level": level, "Time Spent (min)": round(total_time, 2)})
+
+    time_spent = pd.DataFrame(session_times)
+
+    # on filtre les anomalies (exemple : sessions > 24 heures)
+    threshold = 24 * 60
+    anomalies = time_spent[time_spent["Time Spent (min)"] > threshold]
+    if not anomalies.empty:
+        print("Anomalies détectées :")
+        print(anomalies)
+        time_spent = time_spent[time_spent["Time Spent (min)"] <= threshold]
+
+    return time_spent
@@ -0,0 +1,307 @@
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.synthetic import generate_statements, learner_code
+from stub_lrs import StubLRS, load_jsonl
+
+
+# Test de charge : des sessions d'apprenants simultanées envoient les mêmes requêtes que le navigateur
+# à /_dash-update-component (connexion, synchronisation en tâche de fond suivie par polling, pages et
+# tri du tableau des scores, changement de mission, reconnexion servie par le cache), l'application
+# lisant un faux LRS local.
+# Latences p50/p95/p99 et requêtes/s par callback, puis compteurs de cache lus sur /metrics.
+#
+#   python -m benchmarks.loadtest                                  # app lancée ici, 20 sessions simultanées
+#   python -m benchmarks.loadtest --users 50 --sessions 200 --latency 0.2
+#   python -m benchmarks.loadtest --recording lrs.jsonl.gz         # pages enregistrées avec python lrs.py --record
+#   python -m benchmarks.loadtest --url http://127.0.0.1:8050      # déploiement déjà lancé (ex. gunicorn)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER = ("import sys; from werkzeug.serving import run_simple; from app import create_server; "
+          "run_simple('127.0.0.1', int(sys.argv[1]), create_server(), threaded=True)")
+# ces callbacks tournent dans le navigateur (assets/dashboard.js) : aucune requête à mesurer
+CLIENTSIDE = ["toggle_view", "render_graphs", "render_table", "logout", "leave_cohort"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(endpoint, directory, log=subprocess.DEVNULL):
+    # application dans un processus séparé : le générateur de charge ne lui dispute pas le GIL
+    port = free_port()
+    env = dict(os.environ, LRS_ENDPOINT=endpoint, DASHBOARD_CACHE_DIR=directory,
+               DASHBOARD_STORE=os.path.join(directory, "statements.sqlite"), DASHBOARD_LOG_LEVEL="WARNING")
+    process = subprocess.Popen([sys.executable, "-c", SERVER, str(port)], cwd=ROOT, env=env,
+                               stdout=log, stderr=log)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            requests.get(url + "/_dash-dependencies", timeout=1).raise_for_status()
+            return process, url
+        except requests.RequestException:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("l'application n'a pas démarré")
+
+
+def split_outputs(output):
+    # "id.prop" ou "..id1.prop1...id2.prop2.." (sorties multiples), suffixe @... des allow_duplicate retiré
+    def parse(entry):
+        component, prop = entry.rsplit(".", 1)
+        return {"id": component, "property": prop.split("@")[0]}
+
+    if not output.startswith(".."):
+        return parse(output)
+    return [parse(entry) for entry in output.strip(".").split("...")]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.requests = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, requests_sent, error=None):
+        with self._lock:
+            self.requests[name] = self.requests.get(name, 0) + requests_sent
+            if error:
+                reasons = self.errors.setdefault(name, {})
+                reasons[error] = reasons.get(error, 0) + 1
+            else:
+                self.latencies.setdefault(name, []).append(seconds)
+
+    def summary(self, elapsed):
+        results = []
+        for name in sorted(set(self.requests)):
+            latencies = sorted(self.latencies.get(name, []))
+            results.append({
+                "callback": name,
+                "calls": len(latencies),
+                "errors": sum(self.errors.get(name, {}).values()),
+                "error_reasons": self.errors.get(name, {}),
+                "requests": self.requests[name],
+                "requests_per_second": self.requests[name] / elapsed,
+                **{f"p{q}": percentile(latencies, q) for q in (50, 95, 99)},
+            })
+        return results
+
+
+def percentile(values, q):
+    # rang le plus proche sur des valeurs triées
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values) + 0.5) - 1))]
+
+
+class Session:
+    # une session de navigateur : même corps de requête que le renderer Dash, polling des callbacks de fond
+    def __init__(self, url, callbacks, recorder, poll_interval, timeout=120):
+        self.url = url
+        self.callbacks = callbacks
+        self.recorder = recorder
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.http = requests.Session()
+
+    def call(self, name, callback, inputs, state=()):
+        output = callback["output"]
+        body = {
+            "output": output,
+            "outputs": split_outputs(output),
+            "inputs": inputs,
+            "state": list(state),
+            "changedPropIds": [f"{inputs[0]['id']}.{inputs[0]['property']}"],
+        }
+        start = time.perf_counter()
+        sent = 0
+        try:
+            sent += 1
+            response = self.http.post(self.url + "/_dash-update-component", json=body, timeout=self.timeout)
+            response.raise_for_status()
+            payload = response.json()
+            if "cacheKey" in payload:
+                # callback de fond : le navigateur redemande le résultat toutes les interval ms ;
+                # 204 = plus rien à attendre (ex. résultat déjà remis à une autre session du même
+                # apprenant, la clé du job ne dépend que des entrées)
+                query = f"?cacheKey={payload['cacheKey']}&job={payload['job']}"
+                deadline = start + self.timeout
+                while "response" not in payload:
+                    if response.status_code == 204:
+                        raise TimeoutError("204 sans résultat")
+                    if time.perf_counter() > deadline:
+                        raise TimeoutError(f"pas de résultat après {self.timeout} s")
+                    time.sleep(self.poll_interval)
+                    sent += 1
+                    response = self.http.post(self.url + "/_dash-update-component" + query, json=body,
+                                              timeout=self.timeout)
+                    response.raise_for_status()
+                    payload = response.json() if response.content else {}
+        except (requests.RequestException, ValueError, TimeoutError) as error:
+            self.recorder.add(name, None, sent, error=str(error)[:120] or type(error).__name__)
+            return None
+        self.recorder.add(name, time.perf_counter() - start, sent)
+        return payload["response"]
+
+    def login(self, name, identifier):
+        response = self.call(name, self.callbacks["manage_login"],
+                             [{"id": "login-button", "property": "n_clicks", "value": 1}],
+                             [{"id": "input-identifier", "property": "value", "value": identifier}])
+        sync = (response or {}).get("login-sync", {}).get("data")
+        if sync:
+            # apprenant absent du cache : le navigateur enchaîne sur la synchronisation de fond
+            response = self.call("sync_login", self.callbacks["sync_login"],
+                                 [{"id": "login-sync", "property": "data", "value": sync}])
+        return (response or {}).get("learner-data", {}).get("data")
+
+    def score_page(self, identifier, mission, page, sort_by=()):
+        return self.call("page_score_table", self.callbacks["page_score_table"],
+                         [{"id": "score-table", "property": "page_current", "value": page},
+                          {"id": "score-table", "property": "sort_by", "value": list(sort_by)}],
+                         [{"id": "mission-filter", "property": "value", "value": mission},
+                          {"id": "input-identifier", "property": "value", "value": identifier}])
+
+    def run(self, identifier, missions, rng):
+        data = self.login("manage_login", identifier)
+        if not data:
+            return
+        # le changement de mission et l'alternance des vues sont traités dans le navigateur ; seules
+        # les pages suivantes, le tri et le retour à la première page reviennent au serveur
+        for mission in rng.sample(data["missions"], min(missions, len(data["missions"]))):
+            self.score_page(identifier, mission, 1)
+            self.score_page(identifier, mission, 1, [{"column_id": "Score", "direction": "desc"}])
+            self.score_page(identifier, mission, 0)
+        # reconnexion : les agrégats de l'apprenant sont déjà en cache
+        self.login("manage_login (reconnexion)", identifier)
+
+
+def find_callbacks(url):
+    dependencies = requests.get(url + "/_dash-dependencies").json()
+    callbacks = {}
+    for dependency in dependencies:
+        inputs = {(entry["id"], entry["property"]) for entry in dependency["inputs"]}
+        if ("login-button", "n_clicks") in inputs and dependency.get("clientside_function") is None:
+            callbacks["manage_login"] = dependency
+        elif ("login-sync", "data") in inputs:
+            callbacks["sync_login"] = dependency
+        elif dependency["output"].startswith("score-table.data"):
+            callbacks["page_score_table"] = dependency
+    return callbacks
+
+
+def cache_counters(url):
+    # lignes dashboard_cache_requests_total et dashboard_lrs_requests_total de /metrics
+    try:
+        text = requests.get(url + "/metrics", timeout=5).text
+    except requests.RequestException:
+        return []
+    return [line for line in text.splitlines()
+            if line.startswith(("dashboard_cache_requests_total", "dashboard_lrs_requests_total"))]
+
+
+def run(url, identifiers, users, sessions, missions, poll_interval, seed):
+    callbacks = find_callbacks(url)
+    recorder = Recorder()
+
+    def user(number):
+        # chaque utilisateur a ses propres apprenants : la clé d'un job de fond ne dépend que des
+        # entrées, deux connexions simultanées du même apprenant se disputeraient le même résultat
+        own = identifiers[number::users] or [identifiers[number % len(identifiers)]]
+        session_rng = random.Random(seed * 1000 + number)
+        session = Session(url, callbacks, recorder, poll_interval)
+        for count in range(number, sessions, users):
+            session.run(own[count // users % len(own)], missions, session_rng)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+    elapsed = time.perf_counter() - start
+    return recorder.summary(elapsed), elapsed
+
+
+def report(results, elapsed, sessions):
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.0f}"
+
+    print(f"{'callback':<28} {'appels':>7} {'erreurs':>8} {'requêtes':>9} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for result in results:
+        print(f"{result['callback']:<28} {result['calls']:>7} {result['errors']:>8} {result['requests']:>9} "
+              f"{result['requests_per_second']:>8.1f} {ms(result['p50']):>8} {ms(result['p95']):>8} "
+              f"{ms(result['p99']):>8}")
+    print(f"{sessions} sessions en {elapsed:.1f} s ({sessions / elapsed:.2f} sessions/s)")
+    for result in results:
+        for reason, count in result["error_reasons"].items():
+            print(f"erreur {result['callback']} × {count} : {reason}")
+    print("dans le navigateur, sans requête : " + ", ".join(CLIENTSIDE))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test de charge des callbacks Dash du tableau de bord")
+    parser.add_argument("--url", help="application déjà lancée (sinon lancée ici contre un faux LRS)")
+    parser.add_argument("--users", type=int, default=20, help="sessions simultanées")
+    parser.add_argument("--sessions", type=int, help="sessions au total (par défaut 2 × users)")
+    parser.add_argument("--learners", type=int, default=50,
+                        help="apprenants synthétiques (au moins --users pour que chaque utilisateur ait les siens)")
+    parser.add_argument("--statements", type=int, default=1000, help="statements par apprenant synthétique")
+    parser.add_argument("--recording", help="pages LRS enregistrées (.jsonl.gz) à la place des données synthétiques")
+    parser.add_argument("--latency", type=float, default=0.05, help="latence du faux LRS par page (secondes)")
+    parser.add_argument("--missions", type=int, default=3, help="missions consultées par session")
+    parser.add_argument("--poll-interval", type=float, default=0.25,
+                        help="intervalle de polling des callbacks de fond (interval=250 dans app.py)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="écrit les résultats dans ce fichier")
+    parser.add_argument("--app-log", help="journal de l'application lancée ici (par défaut ignoré)")
+    args = parser.parse_args()
+    sessions = args.sessions or 2 * args.users
+
+    if args.recording:
+        statements = load_jsonl(args.recording)
+        identifiers = sorted({statement["actor"]["account"]["name"] for statement in statements})
+    else:
+        statements = generate_statements(args.statements * args.learners, learners=args.learners, seed=args.seed)
+        identifiers = [learner_code(i + 1) for i in range(args.learners)]
+
+    if args.url:
+        # le déploiement lit son propre LRS (ex. LRS_ENDPOINT vers python stub_lrs.py ... --latency)
+        results, elapsed = run(args.url, identifiers, args.users, sessions, args.missions,
+                               args.poll_interval, args.seed)
+        report(results, elapsed, sessions)
+        for line in cache_counters(args.url):
+            print(line)
+    else:
+        with StubLRS(statements, latency=args.latency) as stub, tempfile.TemporaryDirectory() as directory:
+            log = open(args.app_log, "w", encoding="utf-8") if args.app_log else subprocess.DEVNULL
+            process, url = start_app(stub.endpoint, directory, log)
+            try:
+                results, elapsed = run(url, identifiers, args.users, sessions, args.missions,
+                                       args.poll_interval, args.seed)
+                report(results, elapsed, sessions)
+                for line in cache_counters(url):
+                    print(line)
+                print(f"requêtes reçues par le faux LRS : {stub.request_count}")
+            finally:
+                process.terminate()
+                process.wait()
+                if args.app_log:
+                    log.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"elapsed": elapsed, "sessions": sessions, "results": results}, f, indent=2)
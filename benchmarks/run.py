@@ -0,0 +1,147 @@
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from benchmarks.synthetic import iter_statements
+from processing import calculate_time_per_level, frame_budget, frame_bytes, mission_aggregates, process_data
+from score import extract_scores
+
+
+# Banc d'essai des chemins critiques du tableau de bord : temps (meilleur de N) et pic mémoire
+# (tracemalloc, mesuré sur une exécution séparée pour ne pas fausser les temps).
+#
+#   python -m benchmarks.run                               # 1k, 100k et 1M statements
+#   python -m benchmarks.run --sizes 1000,100000 --json bench.json
+#   python -m benchmarks.run --baseline bench.json         # code de sortie 1 en cas de régression
+#
+# La mémoire du DataFrame de statements est comparée au budget processing.frame_budget
+# (code de sortie 1 s'il est dépassé).
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+
+def measure(function, repeat, memory):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return min(timings), peak
+
+
+def cases(size, builders):
+    # (nom, fonction sans argument) ; chaque étape reçoit la sortie déjà calculée de la précédente
+    statements = list(iter_statements(size))
+    df = process_data(statements)[0]
+    learner_df = df.assign(Learner="00000001")
+    aggregates = mission_aggregates(learner_df, builders["thresholds"])
+
+    yield "process_data", lambda: process_data(statements)
+    yield "calculate_time_per_level", lambda: calculate_time_per_level(df)
+    yield "mission_aggregates", lambda: mission_aggregates(learner_df, builders["thresholds"])
+    yield "manage_login figures", lambda: builders["figures"](aggregates)
+    yield "manage_login tables", lambda: builders["tables"](builders["rows"](df, None), aggregates)
+
+
+def load_builders():
+    # imports tardifs : figures charge plotly, l'index des niveaux est lu sur disque
+    from figures import build_learner_figures
+    from level_index import load_index
+    from normalization import threshold_table
+    from views import build_table_views, score_table_rows
+
+    thresholds = threshold_table(load_index())
+    return {
+        "figures": build_learner_figures,
+        "rows": lambda df, mission: score_table_rows(df, mission, thresholds),
+        "tables": build_table_views,
+        "thresholds": thresholds,
+    }
+
+
+def run(sizes, repeat, memory):
+    results = []
+    builders = load_builders()
+
+    seconds, peak = measure(lambda: extract_scores("Levels"), repeat, memory)
+    results.append({"case": "extract_scores", "size": None, "seconds": seconds, "peak_bytes": peak})
+    report(results[-1])
+
+    for size in sizes:
+        for name, function in cases(size, builders):
+            seconds, peak = measure(function, repeat if size < 1_000_000 else 1, memory)
+            results.append({"case": name, "size": size, "seconds": seconds, "peak_bytes": peak})
+            report(results[-1])
+        gc.collect()
+    return results
+
+
+def frame_memory(sizes):
+    # (octets du DataFrame compact, budget) par taille
+    memory = {}
+    for size in sizes:
+        df = process_data(list(iter_statements(size)))[0]
+        memory[size] = (frame_bytes(df), frame_budget(len(df)))
+        print(f"{'mémoire du DataFrame':<26} {size:>11,} {memory[size][0] / 1e3:12.1f} Ko"
+              f"  (budget {memory[size][1] / 1e3:.1f} Ko)")
+        del df
+        gc.collect()
+    return memory
+
+
+def report(result):
+    size = "-" if result["size"] is None else f"{result['size']:,}"
+    peak = "" if result["peak_bytes"] is None else f"{result['peak_bytes'] / 1e6:10.1f} Mo"
+    print(f"{result['case']:<26} {size:>11} {result['seconds'] * 1000:12.1f} ms {peak}", flush=True)
+
+
+def regressions(results, baseline, tolerance):
+    reference = {(entry["case"], entry["size"]): entry for entry in baseline}
+    found = []
+    for result in results:
+        previous = reference.get((result["case"], result["size"]))
+        if previous and result["seconds"] > previous["seconds"] * (1 + tolerance):
+            found.append((result, previous))
+    return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc d'essai des chemins critiques du tableau de bord")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="nombres de statements séparés par des virgules")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="ne pas mesurer le pic mémoire (plus rapide)")
+    parser.add_argument("--json", help="écrit les résultats dans ce fichier")
+    parser.add_argument("--baseline", help="résultats de référence (JSON) à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="ralentissement toléré (0.25 = +25 %%)")
+    args = parser.parse_args()
+
+    print(f"{'cas':<26} {'statements':>11} {'temps':>15} {'pic mémoire':>13}")
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run(sizes, args.repeat, not args.no_memory)
+    over_budget = [size for size, (used, budget) in frame_memory(sizes).items() if used > budget]
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for result, previous in found:
+            print(f"RÉGRESSION {result['case']} ({result['size']}) : "
+                  f"{previous['seconds'] * 1000:.1f} ms -> {result['seconds'] * 1000:.1f} ms")
+        sys.exit(1 if found or over_budget else 0)
+    sys.exit(1 if over_budget else 0)
@@ -0,0 +1,79 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from processing import CONTEXT_EXTENSION, PROGRESS_EXTENSION, SCORE_EXTENSION
+
+
+# Générateur déterministe de statements xAPI ayant la forme de ceux envoyés par SPY :
+# extensions progress/context, scores en liste, en chaîne ou en nombre, verbes completed/failed/launched.
+
+VERB_PREFIX = "http://adlnet.gov/expapi/verbs/"
+HOME_PAGE = "https://www.lip6.fr/mocah/"
+
+
+def learner_code(index):
+    return f"{index:08X}"
+
+
+def iter_statements(n, learners=1, seed=0, scenario="Infiltration", missions=20):
+    # un apprenant après l'autre, chacun du plus récent au plus ancien (ordre du LRS) ;
+    # rien n'est gardé en mémoire, ce qui permet de descendre à des millions de statements
+    rng = random.Random(seed)
+    end = datetime(2025, 6, 27, 18, 0, tzinfo=timezone.utc)
+
+    # les sous-objets identiques sont partagés entre statements (lecture seule) pour limiter la mémoire
+    verbs = {verb: {"id": VERB_PREFIX + verb} for verb in ("launched", "completed", "failed")}
+    objects = {}
+    for mission in range(1, missions + 1):
+        level = f"mission{mission:02d}"
+        object_id = f"https://spy.lip6.fr/xapi/activities/{scenario}/{level}"
+        extensions = {PROGRESS_EXTENSION: [level], CONTEXT_EXTENSION: [scenario]}
+        objects[level] = (
+            {"id": object_id, "definition": {"extensions": extensions}},
+            {"id": object_id, "definition": {"extensions": {}}},
+        )
+
+    per_learner = max(1, n // learners)
+    for learner in range(learners):
+        name = learner_code(learner + 1)
+        actor = {"name": name, "account": {"homePage": HOME_PAGE, "name": name}}
+        clock = end - timedelta(minutes=rng.randint(0, 600))
+        mission = rng.randint(1, missions)
+        count = per_learner if learner < learners - 1 else n - per_learner * (learners - 1)
+        for i in range(count):
+            level = f"mission{mission:02d}"
+            verb = rng.choices(["launched", "completed", "failed"], weights=[2, 1, 2])[0]
+
+            result = {"success": verb == "completed", "extensions": {}}
+            if verb != "launched":
+                score = rng.randint(1500, 11000)
+                # le score arrive tantôt en liste, tantôt en chaîne, tantôt en nombre
+                result["extensions"][SCORE_EXTENSION] = rng.choice([[score], [str(score)], str(score), score])
+
+            # environ un statement sur dix arrive sans extension de progression
+            with_progress, without_progress = objects[level]
+            statement_object = with_progress if rng.random() > 0.1 else without_progress
+
+            timestamp = clock.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+            yield {
+                "id": f"{name}-{count - i:07d}",
+                "actor": actor,
+                "verb": verbs[verb],
+                "object": statement_object,
+                "result": result,
+                "timestamp": timestamp,
+                "stored": timestamp,
+            }
+
+            # on remonte le temps : avant une réussite, l'apprenant était souvent sur la mission précédente
+            if verb == "completed" and rng.random() > 0.3:
+                mission = (mission - 2) % missions + 1
+            # quelques longues pauses pour créer plusieurs sessions
+            clock -= timedelta(seconds=rng.choice([20, 45, 90, 240]) if rng.random() > 0.02 else rng.randint(3600, 86400))
+
+
+def generate_statements(n, learners=1, seed=0, scenario="Infiltration", missions=20):
+    statements = list(iter_statements(n, learners, seed, scenario, missions))
+    # ordre du LRS : du plus récent au plus ancien
+    statements.sort(key=lambda statement: statement["stored"], reverse=True)
+    return statements
@@ -0,0 +1,162 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# Cache côté serveur : agrégats (apprenant, scénario, mission), figures sérialisées et lignes du
+# tableau des scores. Les valeurs sont stockées picklées : chaque lecture renvoie une copie
+# indépendante (les callbacks modifient les DataFrames) et la taille mémoire est connue exactement.
+
+
+class MemoryCache:
+    def __init__(self, ttl=600, max_entries=1024, max_bytes=256 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expire_at, payload)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            payload = entry[1]
+        return pickle.loads(payload)
+
+    def set(self, key, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, payload)
+            self._size += len(payload)
+            # éviction LRU : les entrées les moins récemment lues partent en premier
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key):
+        _, payload = self._entries.pop(key)
+        self._size -= len(payload)
+
+
+def thread_connection(local, path):
+    # une connexion par thread et par processus (les workers sont forkés)
+    conn = getattr(local, "conn", None)
+    if conn is None or local.pid != os.getpid():
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        local.conn = conn
+        local.pid = os.getpid()
+    return conn
+
+
+class SQLiteCache:
+    # Partagé entre plusieurs workers gunicorn d'une même machine via un fichier SQLite (mode WAL).
+
+    def __init__(self, path, ttl=600, max_entries=1024, max_bytes=1024 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+            " expire_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+
+    def _connect(self):
+        return thread_connection(self._local, self.path)
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, expire_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < now:
+            if row is not None:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expire_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(payload), len(payload), now + self.ttl, now),
+            )
+            conn.execute("DELETE FROM entries WHERE expire_at < ?", (now,))
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn):
+        count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall()
+        for key, entry_size in rows:
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            count -= 1
+            size -= entry_size
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM entries")
+
+
+def make_cache(name, backend=None, directory=None, shared=False, **options):
+    # DASHBOARD_CACHE=sqlite (par défaut) ou memory ; les limites se règlent par variables d'environnement.
+    # shared : cache écrit par les callbacks de fond (processus séparés), que memory ne verrait jamais
+    backend = backend or os.environ.get("DASHBOARD_CACHE", "sqlite")
+    options.setdefault("ttl", float(os.environ.get("DASHBOARD_CACHE_TTL", 600)))
+    if "DASHBOARD_CACHE_MAX_ENTRIES" in os.environ:
+        options.setdefault("max_entries", int(os.environ["DASHBOARD_CACHE_MAX_ENTRIES"]))
+    if "DASHBOARD_CACHE_MAX_BYTES" in os.environ:
+        options.setdefault("max_bytes", int(os.environ["DASHBOARD_CACHE_MAX_BYTES"]))
+
+    if backend == "memory":
+        if shared:
+            raise ValueError(f"Cache {name} partagé avec les callbacks de fond : backend sqlite requis")
+        return MemoryCache(**options)
+    if backend == "sqlite":
+        directory = directory or os.environ.get("DASHBOARD_CACHE_DIR", ".cache")
+        return SQLiteCache(os.path.join(directory, f"{name}.sqlite"), **options)
+    raise ValueError(f"Backend de cache inconnu : {backend}")
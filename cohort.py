@@ -0,0 +1,77 @@
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from figures import LABELS, cohort_box, heatmap
+from normalization import mission_keys, ordered_mission_keys
+from processing import AGGREGATE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Vue classe : les pages LRS de tous les apprenants sont récupérées en parallèle, analysées en un lot,
+# puis les agrégats (apprenant, scénario, mission) réunis dans un seul DataFrame.
+
+COHORT_WORKERS = 16
+SUMMARY_COLUMNS = [
+    "Learner", "Scenario", "Mission Level", "Position", "Average Score", "Nombre d'essai", "Time Spent (min)",
+]
+
+
+def parse_identifiers(text):
+    # codes SPY séparés par des espaces, virgules, points-virgules ou retours à la ligne (sans doublons)
+    return list(dict.fromkeys(code for code in re.split(r"[\s,;]+", text or "") if code))
+
+
+def fetch_cohort(identifiers, fetch, max_workers=COHORT_WORKERS):
+    # fetch(identifier) -> nouveaux statements de l'apprenant (ex. Services.fetch_learner) ; seules les
+    # requêtes au LRS sont parallèles, l'analyse se fait ensuite en un lot (StatementStore.ingest_many)
+    def fetch_one(identifier):
+        try:
+            return identifier, fetch(identifier)
+        except Exception:
+            logger.warning("Apprenant non chargé", exc_info=True, extra={"fields": {"learner": identifier}})
+            return identifier, None
+
+    statements, errors = {}, []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(identifiers)))) as pool:
+        for identifier, learner_statements in pool.map(fetch_one, identifiers):
+            if learner_statements is None:
+                errors.append(identifier)
+            else:
+                statements[identifier] = learner_statements
+    return statements, errors
+
+
+def combine_aggregates(frames):
+    # agrégats des apprenants chargés, réunis dans un seul DataFrame
+    if not frames:
+        return pd.DataFrame(columns=AGGREGATE_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def cohort_summary(aggregates):
+    # une ligne par (apprenant, scénario, mission) : score moyen normalisé, nombre d'essais, temps passé
+    return aggregates[SUMMARY_COLUMNS].sort_values(["Learner", "Scenario", "Position", "Mission Level"],
+                                                   ignore_index=True)
+
+
+def cohort_figures(summary):
+    # missions repérées par leur clé "scénario/mission", dans l'ordre de l'index des niveaux
+    missions = ordered_mission_keys(summary)
+    summary = summary.assign(**{"Mission Level": mission_keys(summary)})
+    figures = [
+        (title, cohort_box(summary, column, title, missions))
+        for column, title in [
+            ("Average Score", "Scores de la classe par niveau"),
+            ("Nombre d'essai", "Essais de la classe par niveau"),
+            ("Time Spent (min)", "Temps passé par la classe par niveau"),
+        ]
+    ]
+    # carte de chaleur apprenants x missions : une case vide = mission jamais ouverte
+    scores = summary.pivot(index="Learner", columns="Mission Level", values="Average Score")[missions]
+    figures.append(("Scores de chaque apprenant par niveau",
+                    heatmap(scores, LABELS["Mission Level"], LABELS["Learner"], LABELS["Average Score"],
+                            "Scores de chaque apprenant par niveau", "Viridis")))
+    return figures
@@ -0,0 +1,201 @@
+import hashlib
+
+import pandas as pd
+import plotly.graph_objects as go
+
+from normalization import mission_keys
+
+
+# Figures construites avec graph_objects à partir des agrégats (apprenant, mission) et mises en cache
+# sous forme de dict prêt à envoyer : une reconnexion sans nouvelles données ne reconstruit rien.
+
+# reprend l'allure du thème "seaborn" sans embarquer tout le template dans chaque figure
+TEMPLATE = go.layout.Template(layout=dict(
+    colorway=["rgb(76,114,176)", "rgb(221,132,82)", "rgb(85,168,104)", "rgb(196,78,82)", "rgb(129,114,179)"],
+    font=dict(color="rgb(36,36,36)"),
+    paper_bgcolor="white",
+    plot_bgcolor="rgb(234,234,242)",
+    hovermode="closest",
+    xaxis=dict(gridcolor="white", linecolor="white", zerolinecolor="white", automargin=True),
+    yaxis=dict(gridcolor="white", linecolor="white", zerolinecolor="white", automargin=True),
+))
+
+LABELS = {
+    "Mission Level": "Niveau de Mission",
+    "Average Score": "Score Moyen (%)",
+    "Nombre d'essai": "Nombre d'Essais",
+    "Time Spent (min)": "Temps Passé (min)",
+    "Learner": "Apprenant",
+    "Scenario": "Scénario",
+    "Completion Rate": "Réussite (%)",
+    "Drop-off Rate": "Abandons (%)",
+    "Tries per Learner": "Essais par apprenant",
+}
+LEARNER_COLUMNS = ["Scenario", "Mission Level", "Position", "Average Score", "Nombre d'essai", "Time Spent (min)"]
+
+
+def content_key(prefix, frame):
+    # empreinte du contenu (valeurs et noms de colonnes), indépendante de l'index
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\0".join(frame.columns).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+    return f"{prefix}|{digest.hexdigest()}"
+
+
+def hover(x, y):
+    return f"{LABELS[x]}=%{{x}}<br>{LABELS[y]}=%{{y}}<extra></extra>"
+
+
+def horizontal_bar(df, x, title, colorscale):
+    return go.Figure(
+        go.Bar(
+            x=df[x].tolist(),
+            y=df["Mission Level"].tolist(),
+            orientation="h",
+            marker=dict(color=df[x].tolist(), colorscale=colorscale, colorbar=dict(title=LABELS[x])),
+            hovertemplate=f"{LABELS[x]}=%{{x}}<br>{LABELS['Mission Level']}=%{{y}}<extra></extra>",
+        ),
+        layout=dict(title=title, template=TEMPLATE, xaxis_title=LABELS[x], yaxis_title=LABELS["Mission Level"]),
+    )
+
+
+def build_learner_figures(aggregates):
+    # une mission par (scénario, mission) : les abscisses portent la clé "scénario/mission", dans l'ordre
+    # de jeu des niveaux (Position, cf. normalization.threshold_table)
+    aggregates = aggregates.sort_values(["Scenario", "Position", "Mission Level"])
+    aggregates = aggregates.assign(**{"Mission Level": mission_keys(aggregates)})
+
+    # Graphique pour l'évolution des scores
+    scores = aggregates[["Mission Level", "Average Score"]].round(2)
+    fig_score_evolution = go.Figure(
+        go.Scatter(
+            x=scores["Mission Level"].tolist(),
+            y=scores["Average Score"].tolist(),
+            mode="lines+markers",
+            hovertemplate=hover("Mission Level", "Average Score"),
+        ),
+        layout=dict(
+            title="Évolution des scores par niveau de mission",
+            template=TEMPLATE,
+            xaxis_title=LABELS["Mission Level"],
+            yaxis=dict(title=LABELS["Average Score"], range=[0, 105], tickformat=".1f%%"),
+        ),
+    )
+
+    # Graphique pour le nombre d'essais
+    fig_attempts = horizontal_bar(aggregates, "Nombre d'essai", "Nombre d'essais par niveau", "Burg")
+
+    # un graphique en barres horizontales, missions dans l'ordre des niveaux
+    time_spent = aggregates.dropna(subset=["Time Spent (min)"])
+    fig_time_spent = horizontal_bar(time_spent, "Time Spent (min)", "Temps passé par niveau", "Blugrn")
+    fig_time_spent.update_layout(
+        yaxis=dict(categoryorder="array", categoryarray=time_spent["Mission Level"].tolist())
+    )
+
+    return [fig.to_dict() for fig in (fig_score_evolution, fig_attempts, fig_time_spent)]
+
+
+def learner_figures(aggregates, cache=None):
+    # [évolution des scores, essais, temps passé] en dicts ; cache = make_cache(...) ou None
+    if cache is None:
+        return build_learner_figures(aggregates)
+    key = content_key("learner-figures", aggregates[LEARNER_COLUMNS])
+    figures = cache.get(key)
+    if figures is None:
+        figures = build_learner_figures(aggregates)
+        cache.set(key, figures)
+    return figures
+
+
+def cohort_box(summary, column, title, missions):
+    # missions : clés dans l'ordre de l'axe (normalization.ordered_mission_keys)
+    return go.Figure(
+        go.Box(
+            x=summary["Mission Level"].tolist(),
+            y=summary[column].tolist(),
+            boxpoints="all",
+            customdata=summary[["Learner"]].values.tolist(),
+            hovertemplate=(f"{LABELS['Mission Level']}=%{{x}}<br>{LABELS[column]}=%{{y}}"
+                           "<br>Learner=%{customdata[0]}<extra></extra>"),
+        ),
+        layout=dict(
+            title=title,
+            template=TEMPLATE,
+            xaxis=dict(title=LABELS["Mission Level"], categoryorder="array", categoryarray=missions),
+            yaxis_title=LABELS[column],
+        ),
+    )
+
+
+def heatmap(table, x, y, z, title, colorscale):
+    # table : lignes -> axe y, colonnes -> axe x ; cases vides (None) pour les valeurs manquantes
+    values = table.astype(object).where(table.notna(), None)
+    return go.Figure(
+        go.Heatmap(
+            z=values.values.tolist(),
+            x=[str(column) for column in table.columns],
+            y=[str(row) for row in table.index],
+            colorscale=colorscale,
+            colorbar=dict(title=z),
+            hoverongaps=False,
+            hovertemplate=f"{x}=%{{x}}<br>{y}=%{{y}}<br>{z}=%{{z}}<extra></extra>",
+        ),
+        layout=dict(title=title, template=TEMPLATE, xaxis=dict(title=x, type="category"),
+                    yaxis=dict(title=y, type="category", autorange="reversed")),
+    )
+
+
+def difficulty_figure(curve, scenario):
+    # réussite et abandons (%) à gauche, essais par apprenant à droite ; structure du niveau au survol
+    missions = curve["Mission Level"].tolist()
+    structure = curve[["Blocks", "Map Cells", "Coins"]]
+    customdata = structure.astype(object).where(structure.notna(), "?").values.tolist()
+    level = "<br>blocs autorisés=%{customdata[0]}<br>cases=%{customdata[1]}<br>pièces=%{customdata[2]}<extra></extra>"
+    traces = [
+        go.Scatter(x=missions, y=curve[column].tolist(), name=LABELS[column], mode="lines+markers",
+                   customdata=customdata, hovertemplate=f"{LABELS[column]}=%{{y}}" + level, yaxis=axis)
+        for column, axis in [("Completion Rate", "y"), ("Drop-off Rate", "y"), ("Tries per Learner", "y2")]
+    ]
+    return go.Figure(
+        traces,
+        layout=dict(
+            title=f"Difficulté des missions ({scenario})",
+            template=TEMPLATE,
+            hovermode="x unified",
+            xaxis=dict(title=LABELS["Mission Level"], type="category"),
+            yaxis=dict(title="%", range=[0, 105]),
+            yaxis2=dict(title=LABELS["Tries per Learner"], overlaying="y", side="right", rangemode="tozero", showgrid=False),
+        ),
+    )
+
+
+def build_learning_path_figures(path):
+    # path = analytics.learning_path(...) ; [(titre, figure en dict)]
+    scenario = path["scenario"]
+    figures = [
+        ("Difficulté, abandons et essais par mission", difficulty_figure(path["curve"], scenario)),
+        ("Tunnel de réussite et de relance par mission",
+         heatmap(path["funnel"], LABELS["Mission Level"], "Étape", "% des apprenants",
+                 f"Apprenants à chaque étape ({scenario})", "Teal")),
+        ("Réussite par scénario et par mission",
+         heatmap(path["completion"], LABELS["Mission Level"], LABELS["Scenario"], LABELS["Completion Rate"],
+                 "Part des apprenants ayant réussi chaque mission", "RdYlGn")),
+    ]
+    return [(title, fig.to_dict()) for title, fig in figures]
+
+
+def learning_path_figures(path, cache=None):
+    # même mémorisation que learner_figures, par empreinte des tableaux affichés
+    if cache is None:
+        return build_learning_path_figures(path)
+    key = "|".join([
+        "learning-path", path["scenario"],
+        content_key("curve", path["curve"]),
+        content_key("funnel", path["funnel"].reset_index()),
+        content_key("completion", path["completion"].reset_index()),
+    ])
+    figures = cache.get(key)
+    if figures is None:
+        figures = build_learning_path_figures(path)
+        cache.set(key, figures)
+    return figures
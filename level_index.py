@@ -0,0 +1,122 @@
+import hashlib
+import json
+import logging
+import os
+import xml.etree.ElementTree as ET
+
+from score import map_files, scenario_files
+
+logger = logging.getLogger(__name__)
+
+# Index compilé des métadonnées des niveaux (scores, limites de blocs, carte, dialogues...).
+# Construit une fois (python level_index.py) puis simplement relu au démarrage des workers ;
+# il est reconstruit automatiquement si un .xml ou le fichier d'overrides change.
+
+LEVELS_DIR = "Levels"
+INDEX_PATH = os.path.join(".cache", "level_index.json")
+OVERRIDES_PATH = "level_overrides.json"
+INDEX_VERSION = 2
+
+
+def signature(base_dir=LEVELS_DIR, overrides_path=OVERRIDES_PATH):
+    # empreinte (chemin, mtime, taille) de chaque fichier source : aucun parsing nécessaire
+    digest = hashlib.sha1(str(INDEX_VERSION).encode())
+    paths = [path for _, _, path in scenario_files(base_dir)]
+    if os.path.exists(overrides_path):
+        paths.append(overrides_path)
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode())
+    return digest.hexdigest()
+
+
+def parse_level(path):
+    try:
+        root = ET.parse(path).getroot()
+    except ET.ParseError:
+        logger.warning("Erreur de parsing du niveau", extra={"fields": {"path": path}})
+        return None
+    metadata = {}
+
+    score = root.find("score")
+    if score is not None:
+        for key in ("threeStars", "twoStars"):
+            if score.get(key) is not None:
+                metadata[key] = int(score.get(key))
+
+    metadata["blockLimits"] = {
+        block.get("blockType"): int(block.get("limit"))
+        for block in root.iterfind("blockLimits/blockLimit")
+    }
+
+    lines = root.findall("map/line")
+    metadata["map"] = {"height": len(lines), "width": max((len(line) for line in lines), default=0)}
+    metadata["dialogs"] = len(root.findall("dialogs/dialog"))
+    metadata["coins"] = [[int(coin.get("posX")), int(coin.get("posY"))] for coin in root.iter("coin")]
+    metadata["robots"] = len(root.findall("robot"))
+    metadata["guards"] = len(root.findall("guard"))
+
+    execution_limit = root.find("executionLimit")
+    if execution_limit is not None:
+        metadata["executionLimit"] = int(execution_limit.get("amount"))
+    return metadata
+
+
+def load_overrides(overrides_path=OVERRIDES_PATH):
+    if not os.path.exists(overrides_path):
+        return {}
+    with open(overrides_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_index(base_dir=LEVELS_DIR, overrides_path=OVERRIDES_PATH):
+    levels = {}
+    files = list(scenario_files(base_dir))
+    parsed = map_files(parse_level, [path for _, _, path in files])
+    for (folder, mission, path), metadata in zip(files, parsed):
+        folder_levels = levels.setdefault(folder, {})
+        if metadata is None:
+            continue
+        metadata["file"] = os.path.relpath(path, base_dir)
+        folder_levels[mission] = metadata
+
+    # corrections explicites (ex. Infiltration/mission08 n'a pas de .xml)
+    for folder, missions in load_overrides(overrides_path).items():
+        for mission, values in missions.items():
+            levels.setdefault(folder, {}).setdefault(mission, {}).update(values)
+
+    # rang de chaque niveau dans son scénario (1, 2, ...) : ordre des fichiers, sauf "position" explicite
+    # dans les overrides (ex. Tutoriel, dont les noms ne suivent pas l'ordre de jeu)
+    for missions in levels.values():
+        for position, mission in enumerate(sorted(missions), start=1):
+            missions[mission].setdefault("position", position)
+
+    return {"version": INDEX_VERSION, "signature": signature(base_dir, overrides_path), "levels": levels}
+
+
+def write_index(index, index_path=INDEX_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, index_path)  # atomique : plusieurs workers peuvent démarrer en même temps
+
+
+def load_index(base_dir=LEVELS_DIR, index_path=INDEX_PATH, overrides_path=OVERRIDES_PATH):
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION and index.get("signature") == signature(base_dir, overrides_path):
+            return index
+    except (OSError, ValueError):
+        pass
+    index = build_index(base_dir, overrides_path)
+    write_index(index, index_path)
+    return index
+
+
+if __name__ == "__main__":
+    index = build_index()
+    write_index(index)
+    count = sum(len(missions) for missions in index["levels"].values())
+    print(f"{count} niveaux indexés dans {INDEX_PATH}")
@@ -0,0 +1,118 @@
+import argparse
+import gzip
+import json
+import os
+import threading
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import lrs_requests
+
+
+LRS_ENDPOINT = os.environ.get("LRS_ENDPOINT", "https://lrsels.lip6.fr/data/xAPI/statements")
+LRS_AUTH = ("9fe9fa9a494f2b34b3cf355dcf20219d7be35b14", "b547a66817be9c2dbad2a5f583e704397c9db809")
+HOME_PAGE = "https://www.lip6.fr/mocah/"
+PAGE_LIMIT = 500
+# fichier .jsonl.gz où enregistrer les pages reçues, rejouées ensuite par stub_lrs.py (hors ligne)
+LRS_RECORD = os.environ.get("LRS_RECORD")
+
+
+def agent_filter(identifier):
+    return json.dumps({"account": {"homePage": HOME_PAGE, "name": identifier}})
+
+
+class LRSClient:
+    # Client réutilisable : une session requests partagée (connexions keep-alive en pool),
+    # timeouts connexion/lecture, reprises bornées avec backoff et nombre limité de requêtes simultanées.
+
+    def __init__(self, endpoint=LRS_ENDPOINT, auth=LRS_AUTH, timeout=(3.05, 20), retries=3,
+                 backoff_factor=0.5, pool_size=16, max_concurrency=16, page_limit=PAGE_LIMIT,
+                 record_path=LRS_RECORD):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.page_limit = page_limit
+        self.record_path = record_path
+        self.request_count = 0
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.auth = auth
+        self.session.headers.update({
+            "X-Experience-API-Version": "1.0.3",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def _get(self, url, params=None):
+        with self._slots:
+            self.request_count += 1
+            lrs_requests.inc()
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        if response.status_code != 200:
+            raise Exception(f"Error fetching data: {response.status_code}, {response.text}")
+        return response.json()
+
+    def iter_pages(self, identifier, since=None):
+        # suit le lien "more" de l'API xAPI jusqu'à la dernière page
+        params = {"agent": agent_filter(identifier), "limit": self.page_limit}
+        if since:
+            params["since"] = since
+        url = self.endpoint
+        number = 0
+        while url:
+            body = self._get(url, params)
+            number += 1
+            if self.record_path:
+                record_page(self.record_path, identifier, since, number, body["statements"])
+            yield body["statements"]
+            more = body.get("more")
+            url = urljoin(self.endpoint, more) if more else None
+            params = None  # le lien "more" contient déjà tous les paramètres
+
+    def iter_statements(self, identifier, since=None):
+        for page in self.iter_pages(identifier, since=since):
+            yield from page
+
+    def fetch(self, identifier):
+        return list(self.iter_statements(identifier))
+
+    def close(self):
+        self.session.close()
+
+
+def record_page(path, identifier, since, number, statements):
+    # une ligne par page, compressée en un membre gzip écrit d'un bloc : les synchronisations
+    # lancées en parallèle (processus de fond) peuvent enregistrer dans le même fichier
+    line = json.dumps({"agent": identifier, "since": since, "page": number, "statements": statements})
+    with open(path, "ab") as f:
+        f.write(gzip.compress(line.encode() + b"\n"))
+
+
+default_client = LRSClient()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enregistre l'historique LRS d'apprenants pour le rejouer hors ligne")
+    parser.add_argument("identifiers", nargs="+")
+    parser.add_argument("--record", required=True, help="fichier .jsonl.gz (complété s'il existe)")
+    parser.add_argument("--endpoint", default=LRS_ENDPOINT)
+    args = parser.parse_args()
+
+    client = LRSClient(endpoint=args.endpoint, record_path=args.record)
+    for identifier in args.identifiers:
+        print(f"{identifier} : {len(client.fetch(identifier))} statements")
+    client.close()
+    print(f"rejouer avec : python stub_lrs.py {args.record}")
@@ -0,0 +1,231 @@
+import bisect
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from cache import thread_connection
+
+
+# Mesures du tableau de bord sans dépendance externe : histogrammes de durée (spans et callbacks),
+# compteurs (cache, requêtes LRS) et rendu au format texte Prometheus sur /metrics.
+# Les diagnostics passent par logging, une ligne clé=valeur par événement.
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger("dashboard")
+
+
+def label_string(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+class MemorySamples:
+    # valeurs cumulées (métrique, labels, case) -> total, propres au processus courant
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def add(self, updates):
+        with self._lock:
+            for key, amount in updates:
+                self._values[key] = self._values.get(key, 0) + amount
+
+    def items(self, name):
+        with self._lock:
+            return {(labels, slot): amount for (metric, labels, slot), amount in self._values.items() if metric == name}
+
+
+class SQLiteSamples:
+    # mêmes valeurs dans une base SQLite : partagées par les workers et les processus des callbacks de fond
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS samples (metric TEXT NOT NULL, labels TEXT NOT NULL, slot TEXT NOT NULL,"
+            " amount REAL NOT NULL, PRIMARY KEY (metric, labels, slot))"
+        )
+
+    def _connect(self):
+        return thread_connection(self._local, self.path)
+
+    def __reduce__(self):
+        # copié dans un processus de fond : il rouvre le même fichier
+        return SQLiteSamples, (self.path,)
+
+    def add(self, updates):
+        rows = [(metric, json.dumps(labels), slot, amount) for (metric, labels, slot), amount in updates]
+        self._connect().executemany(
+            "INSERT INTO samples (metric, labels, slot, amount) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (metric, labels, slot) DO UPDATE SET amount = amount + excluded.amount",
+            rows,
+        )
+
+    def items(self, name):
+        rows = self._connect().execute("SELECT labels, slot, amount FROM samples WHERE metric = ?", (name,))
+        return {(tuple(json.loads(labels)), slot): amount for labels, slot, amount in rows}
+
+
+class Histogram:
+    def __init__(self, registry, name, help, labels, buckets=BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, values, seconds):
+        # values : valeurs des labels, dans l'ordre de self.labels
+        values = tuple(values)
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        self.registry.samples.add([
+            ((self.name, values, str(bucket)), 1),
+            ((self.name, values, "count"), 1),
+            ((self.name, values, "sum"), seconds),
+        ])
+
+    def samples(self):
+        items = self.registry.samples.items(self.name)
+        for values in sorted({values for values, _ in items}):
+            labels = dict(zip(self.labels, values))
+            cumulative = 0
+            for index, bound in enumerate(self.buckets + (float("inf"),)):
+                cumulative += items.get((values, str(index)), 0)
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", {**labels, "le": le}, int(cumulative)
+            yield f"{self.name}_count", labels, int(items.get((values, "count"), 0))
+            yield f"{self.name}_sum", labels, items.get((values, "sum"), 0)
+
+
+class Counter:
+    def __init__(self, registry, name, help, labels=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def inc(self, values=(), amount=1):
+        self.registry.samples.add([((self.name, tuple(values), "total"), amount)])
+
+    def samples(self):
+        for (values, _), amount in sorted(self.registry.samples.items(self.name).items()):
+            yield self.name, dict(zip(self.labels, values)), int(amount)
+
+
+class Registry:
+    def __init__(self):
+        self.samples = MemorySamples()
+        self._metrics = []  # (nom, type, aide, fonction -> [(échantillon, labels, valeur)])
+
+    def share(self, path):
+        # à appeler avant les premières mesures : les valeurs passent dans une base commune aux processus
+        self.samples = SQLiteSamples(path)
+
+    def histogram(self, name, help, labels, buckets=BUCKETS):
+        histogram = Histogram(self, name, help, labels, buckets)
+        self._metrics.append((name, "histogram", help, histogram.samples))
+        return histogram
+
+    def counter(self, name, help, labels=()):
+        counter = Counter(self, name, help, labels)
+        self._metrics.append((name, "counter", help, counter.samples))
+        return counter
+
+    def render(self):
+        lines = []
+        for name, type, help, samples in self._metrics:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {type}")
+            for sample, labels, value in samples():
+                lines.append(f"{sample}{label_string(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+span_seconds = registry.histogram(
+    "dashboard_span_seconds", "Durée des étapes (fetch, parse, aggregate, figures, table...)", ["span"])
+callback_seconds = registry.histogram(
+    "dashboard_callback_seconds", "Latence des callbacks Dash", ["callback"])
+cache_requests = registry.counter(
+    "dashboard_cache_requests_total", "Lectures du cache par résultat", ["cache", "result"])
+lrs_requests = registry.counter("dashboard_lrs_requests_total", "Requêtes HTTP envoyées au LRS")
+
+
+@contextmanager
+def span(name, **fields):
+    # chronomètre une étape ; fields ne sert qu'aux logs (pas de label à forte cardinalité)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        span_seconds.observe([name], seconds)
+        logger.debug("span", extra={"fields": {"span": name, "seconds": round(seconds, 6), **fields}})
+
+
+def timed(name):
+    # décorateur de callback : latence dans dashboard_callback_seconds et une ligne de log
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = "error"
+            try:
+                result = function(*args, **kwargs)
+                status = "ok"
+                return result
+            finally:
+                seconds = time.perf_counter() - start
+                callback_seconds.observe([name], seconds)
+                logger.info("callback", extra={"fields": {"callback": name, "status": status,
+                                                          "seconds": round(seconds, 6)}})
+        return wrapper
+    return decorator
+
+
+def register_route(server, path="/metrics"):
+    from flask import Response
+
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+    server.add_url_rule(path, "metrics", metrics)
+
+
+class LogfmtFormatter(logging.Formatter):
+    def format(self, record):
+        fields = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            fields["exc"] = self.formatException(record.exc_info)
+        return " ".join(f"{key}={logfmt_value(value)}" for key, value in fields.items())
+
+
+def logfmt_value(value):
+    value = "" if value is None else str(value)
+    if not value or any(char in value for char in ' ="\n'):
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+    return value
+
+
+def configure_logging(level="INFO", stream=None):
+    # à appeler une fois au démarrage ; sans effet si l'application a déjà configuré logging
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(LogfmtFormatter())
+    root.addHandler(handler)
+    root.setLevel(level)
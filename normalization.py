@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+
+# Normalisation des scores par (scénario, mission) : les seuils deux et trois étoiles de l'index des
+# niveaux sont réunis une fois dans une table, puis joints à chaque ligne selon son scénario.
+
+DEFAULT_SCENARIO = "Infiltration"
+THRESHOLD_COLUMNS = ["Two Stars", "Three Stars"]
+# index = nombre d'étoiles (0 : pas de score ou pas de seuil)
+STARS = np.array(["☆ ☆ ☆", "★ ☆ ☆", "★ ★ ☆", "★ ★ ★"], dtype=object)
+# colonne Feedback en catégories, dans l'ordre alphabétique des libellés (tri du tableau inchangé)
+FEEDBACK_CATEGORIES = sorted(STARS)
+FEEDBACK_CODES = np.array([FEEDBACK_CATEGORIES.index(stars) for stars in STARS], dtype=np.int8)
+
+
+def threshold_table(index):
+    # (Scenario, Mission Level) -> Two Stars, Three Stars, Position (rang du niveau dans son scénario),
+    # à partir de level_index.load_index()
+    records = [
+        (scenario, mission, metadata.get("twoStars"), metadata.get("threeStars"), metadata.get("position"))
+        for scenario, missions in index["levels"].items()
+        for mission, metadata in missions.items()
+    ]
+    table = pd.DataFrame.from_records(records, columns=["Scenario", "Mission Level"] + THRESHOLD_COLUMNS + ["Position"])
+    table["Position"] = table["Position"].astype("float64")
+    three_stars = table["Three Stars"].astype("float64")
+    two_stars = table["Two Stars"].astype("float64")
+    # 0 = seuil non renseigné dans le niveau ; un seuil deux étoiles absent ou incohérent
+    # (au-dessus du trois étoiles) retombe sur 70 % du score trois étoiles
+    table["Three Stars"] = three_stars.where(three_stars > 0)
+    table["Two Stars"] = two_stars.where((two_stars > 0) & (two_stars < table["Three Stars"]),
+                                         (table["Three Stars"] * 0.7).round())
+    return table.set_index(["Scenario", "Mission Level"]).sort_index()
+
+
+def row_scenarios(df, default_scenario=DEFAULT_SCENARIO):
+    # les statements sans contexte prennent le scénario de leur mission, sinon le scénario par défaut
+    scenarios = df["Scenario"] if "Scenario" in df else pd.Series(None, index=df.index, dtype=object)
+    keys = [column for column in ("Learner", "Mission Level") if column in df]
+    if scenarios.isna().any() and scenarios.notna().any() and keys:
+        grouped = scenarios.groupby([df[key] for key in keys], sort=False, observed=True)
+        scenarios = scenarios.fillna(grouped.transform("first"))
+    if isinstance(scenarios.dtype, pd.CategoricalDtype) and default_scenario not in scenarios.cat.categories:
+        scenarios = scenarios.cat.add_categories([default_scenario])
+    return scenarios.fillna(default_scenario)
+
+
+def mission_key(scenario, mission):
+    # identifiant d'une mission dans les vues (menu, tableaux, figures) : les noms missionNN se
+    # répètent d'un scénario à l'autre
+    return f"{scenario}/{mission}"
+
+
+def mission_keys(df):
+    return df["Scenario"].astype(str) + "/" + df["Mission Level"].astype(str)
+
+
+def ordered_mission_keys(df):
+    # clés distinctes dans l'ordre de jeu : scénario, rang du niveau dans l'index (Position, niveaux hors
+    # index en dernier) puis nom ; même ordre pour le menu des missions et toutes les figures
+    ordered = df.sort_values(["Scenario", "Position", "Mission Level"])
+    return mission_keys(ordered).drop_duplicates().tolist()
+
+
+def split_mission_key(key):
+    scenario, _, mission = key.partition("/")
+    return scenario, mission
+
+
+def row_thresholds(df, table, default_scenario=DEFAULT_SCENARIO, columns=THRESHOLD_COLUMNS):
+    # seuils de chaque ligne (NaN si le niveau n'est pas dans l'index), alignés sur df.index
+    if table is None or df.empty:
+        return pd.DataFrame(np.nan, index=df.index, columns=columns)
+    keys = pd.MultiIndex.from_arrays([row_scenarios(df, default_scenario), df["Mission Level"]])
+    thresholds = table[columns].reindex(keys)
+    thresholds.index = df.index
+    return thresholds
+
+
+def star_ratings(scores, two_stars, three_stars):
+    # ★★★ dès le score trois étoiles, ★★☆ dès le score deux étoiles ; ☆☆☆ sans score ou sans seuil
+    scores = scores.astype("float64")
+    stars = np.select([scores >= three_stars, scores >= two_stars], [3, 2], 1)
+    stars = np.where(scores.isna() | three_stars.isna(), 0, stars)
+    feedback = pd.Categorical.from_codes(FEEDBACK_CODES[stars], categories=FEEDBACK_CATEGORIES)
+    return pd.Series(feedback, index=scores.index)
+
+
+def percent_of(scores, three_stars):
+    # pourcentage du score trois étoiles, plafonné à 100 ; NaN sans seuil
+    return (scores / three_stars * 100).clip(upper=100).round(1)
@@ -0,0 +1,226 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from normalization import DEFAULT_SCENARIO, THRESHOLD_COLUMNS, percent_of, row_scenarios, row_thresholds
+
+logger = logging.getLogger(__name__)
+
+
+SCORE_EXTENSION = "https://spy.lip6.fr/xapi/extensions/score"
+PROGRESS_EXTENSION = "https://w3id.org/xapi/seriousgames/extensions/progress"
+CONTEXT_EXTENSION = "https://spy.lip6.fr/xapi/extensions/context"
+
+STATEMENT_COLUMNS = ["Timestamp", "Verb", "Actor", "Object", "Score", "Mission Level", "Scenario"]
+
+# DataFrames de statements compacts : textes répétés en catégories (un code int8/int16 par ligne et un
+# dictionnaire par colonne), scores en float32, timestamps en datetime64[ns] (int64). Budget mémoire
+# d'un apprenant : FRAME_OVERHEAD (dictionnaires) + STATEMENT_BYTES par statement, contre ~390 octets
+# par statement en colonnes object ; 5 000 statements tiennent dans ~95 Ko. Vérifié par
+# python -m benchmarks.run.
+CATEGORY_COLUMNS = ["Learner", "Verb", "Actor", "Object", "Mission Level", "Scenario"]
+STATEMENT_BYTES = 18
+FRAME_OVERHEAD = 8 * 1024
+
+
+def _first(value):
+    # les extensions SPY sont des listes d'une valeur (["mission03"], [4875], ["4875"])
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def extract_columns(data):
+    # un seul passage sur le JSON : chaque champ utile part dans sa propre colonne
+    ids, stored, timestamps, verbs, actors, objects = [], [], [], [], [], []
+    successes, scores, mission_levels, scenarios = [], [], [], []
+
+    for statement in data:
+        try:
+            verb = statement["verb"]["id"].rsplit("/", 1)[-1]
+            actor = statement["actor"].get("name", "Unknown")
+            object_data = statement.get("object") or {}
+            result = statement.get("result") or {}
+            extensions = (object_data.get("definition") or {}).get("extensions") or {}
+            score = _first((result.get("extensions") or {}).get(SCORE_EXTENSION))
+        except (KeyError, AttributeError, TypeError):
+            continue
+
+        ids.append(statement.get("id"))
+        stored.append(statement.get("stored"))
+        timestamps.append(statement.get("timestamp"))
+        verbs.append(verb)
+        actors.append(actor)
+        objects.append(object_data.get("id", "Unknown"))
+        successes.append(bool(result.get("success", False)))
+        scores.append(score)
+        mission_levels.append(_first(extensions.get(PROGRESS_EXTENSION)))
+        scenarios.append(_first(extensions.get(CONTEXT_EXTENSION)))
+
+    return {
+        "Id": ids,
+        "Stored": stored,
+        "Timestamp": timestamps,
+        "Verb": verbs,
+        "Actor": actors,
+        "Object": objects,
+        "Success": successes,
+        "Score": scores,
+        "Mission Level": mission_levels,
+        "Scenario": scenarios,
+    }
+
+
+def statements_frame(data, extra_columns=(), sizes=None):
+    # extra_columns : colonnes en plus de STATEMENT_COLUMNS (ex. "Id", "Stored" pour le stockage local) ;
+    # sizes : longueurs de blocs consécutifs indépendants (un par apprenant), que l'héritage ne traverse pas
+    columns = extract_columns(data)
+    success = np.asarray(columns.pop("Success"), dtype=bool)
+
+    df = pd.DataFrame(columns, columns=STATEMENT_COLUMNS + list(extra_columns))
+
+    # score retenu uniquement pour un essai réussi avec un score non nul (listes, chaînes et nombres acceptés)
+    scores = pd.to_numeric(pd.Series(columns["Score"], dtype=object), errors="coerce")
+    df["Score"] = scores.where(success & (scores != 0))
+
+    # un statement sans niveau hérite du niveau et du scénario du statement précédent
+    inherited = df["Mission Level"].isna()
+    if sizes is None:
+        df["Mission Level"] = df["Mission Level"].ffill()
+        df["Scenario"] = df["Scenario"].mask(inherited, df["Scenario"].ffill())
+    else:
+        blocks = np.repeat(np.arange(len(sizes)), sizes)
+        df["Mission Level"] = df["Mission Level"].groupby(blocks).ffill()
+        df["Scenario"] = df["Scenario"].mask(inherited, df["Scenario"].groupby(blocks).ffill())
+    # xAPI : précision variable d'un statement à l'autre (ex. ...45.123Z puis ...45Z)
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"], utc=True, format="ISO8601")
+    return compact_frame(df)
+
+
+def compact_frame(df):
+    # conversion sur place vers les types compacts (voir STATEMENT_BYTES) ; les scores restent exacts
+    # (entiers < 2**24) et sont repassés en float64 avant les sommes
+    for column in CATEGORY_COLUMNS:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    if "Score" in df:
+        df["Score"] = df["Score"].astype("float32")
+    return df
+
+
+def frame_bytes(df):
+    # mémoire réelle du DataFrame, dictionnaires des catégories compris
+    return int(df.memory_usage(deep=True).sum())
+
+
+def frame_budget(statements):
+    return FRAME_OVERHEAD + STATEMENT_BYTES * statements
+
+
+def summarize(df):
+    with_level = df[df["Mission Level"].notna()]
+    all_mission_levels = list(with_level["Mission Level"].unique())
+
+    completed = with_level.loc[with_level["Verb"] == "completed", "Mission Level"].value_counts(sort=False)
+    completed_counts = {level: int(count) for level, count in completed.items() if count}
+
+    scored = with_level.loc[with_level["Score"].notna(), ["Mission Level", "Score"]].astype({"Score": "float64"})
+    grouped = scored.groupby("Mission Level", sort=False, observed=True)["Score"]
+    score_by_level = {level: [] for level in all_mission_levels}
+    score_by_level.update({level: values.tolist() for level, values in grouped})
+
+    totals = grouped.agg(["sum", "count"])
+    averages = np.round(totals["sum"] / totals["count"]).astype(int)
+    avg_score_by_level = {level: None for level in all_mission_levels}
+    avg_score_by_level.update({level: int(value) for level, value in averages.items()})
+
+    return all_mission_levels, completed_counts, avg_score_by_level, score_by_level
+
+
+def process_data(data):
+    df = statements_frame(data)
+    return (df,) + summarize(df)
+
+
+def calculate_time_per_level(df, by=("Mission Level",), session_gap=60, anomaly_threshold=24 * 60):
+    # by=("Actor", "Mission Level") pour traiter une classe entière en un seul appel
+    keys = list(by)
+    time_columns = keys + ["Time Spent (min)"]
+    session_columns = keys + ["Session", "Start", "End", "Statements", "Time Spent (min)"]
+
+    df = df.dropna(subset=keys)[keys + ["Timestamp"]]
+    if df.empty:
+        empty = pd.DataFrame(columns=time_columns)
+        return empty, pd.DataFrame(columns=session_columns), empty.copy()
+
+    # trier par clé et timestamp puis calculer tous les écarts (en minutes) d'un coup
+    df = df.sort_values(by=keys + ["Timestamp"])
+    gaps = df.groupby(keys, sort=False, observed=True)["Timestamp"].diff().dt.total_seconds() / 60
+
+    # un écart > session_gap ouvre une nouvelle session et n'est pas compté
+    new_session = gaps.isna() | (gaps > session_gap)
+    df["Time Spent (min)"] = gaps.mask(new_session, 0)
+    df["Session"] = new_session.cumsum()
+
+    grouped = df.groupby(keys + ["Session"], sort=False, observed=True)
+    sessions = pd.concat([
+        grouped["Timestamp"].agg(["min", "max", "size"]).set_axis(["Start", "End", "Statements"], axis=1),
+        grouped["Time Spent (min)"].sum(),
+    ], axis=1).reset_index()
+    sessions["Session"] = sessions.groupby(keys, sort=False, observed=True).cumcount() + 1
+    sessions["Time Spent (min)"] = sessions["Time Spent (min)"].round(2)
+
+    time_spent = df.groupby(keys, observed=True)["Time Spent (min)"].sum().round(2).reset_index()
+
+    # on écarte les anomalies (exemple : plus de 24 heures sur un niveau) et on les renvoie à l'appelant
+    is_anomaly = time_spent["Time Spent (min)"] > anomaly_threshold
+    anomalies = time_spent[is_anomaly].reset_index(drop=True)
+    time_spent = time_spent[~is_anomaly].reset_index(drop=True)
+
+    return time_spent, sessions[session_columns], anomalies
+
+
+AGGREGATE_COLUMNS = [
+    "Learner", "Mission Level", "Scenario", "Statements", "Completed", "Failed", "Nombre d'essai",
+    "Best Score", "Mean Score", "Min Score", "Score Sum", "Raw Average Score", "Average Score",
+    "Time Spent (min)", "Two Stars", "Three Stars", "Position",
+]
+
+
+def mission_aggregates(df, thresholds, default_scenario=DEFAULT_SCENARIO):
+    # une ligne par (apprenant, scénario, mission) ; thresholds = normalization.threshold_table(index)
+    keys = ["Learner", "Scenario", "Mission Level"]
+    df = df.dropna(subset=["Learner", "Mission Level"])
+    if df.empty:
+        return pd.DataFrame(columns=AGGREGATE_COLUMNS)
+
+    # chaque ligne est normalisée par les seuils de son propre scénario
+    df = df.assign(Scenario=row_scenarios(df, default_scenario), Score=df["Score"].astype("float64"))
+    level = THRESHOLD_COLUMNS + ["Position"]
+    df = pd.concat([df, row_thresholds(df, thresholds, default_scenario, columns=level)], axis=1)
+
+    grouped = df.groupby(keys, sort=False, observed=True)
+    scores = grouped["Score"].agg(["count", "max", "mean", "min", "sum"])
+    scores.columns = ["Nombre d'essai", "Best Score", "Mean Score", "Min Score", "Score Sum"]
+    aggregates = pd.concat([
+        grouped[level].first(),
+        grouped.size().rename("Statements"),
+        (df["Verb"] == "completed").groupby([df[key] for key in keys], sort=False, observed=True).sum().rename("Completed"),
+        (df["Verb"] == "failed").groupby([df[key] for key in keys], sort=False, observed=True).sum().rename("Failed"),
+        scores,
+    ], axis=1).reset_index()
+
+    # score moyen arrondi puis remis à niveau en pourcentage du score trois étoiles (plafonné à 100)
+    raw_average = np.round(aggregates["Score Sum"] / aggregates["Nombre d'essai"].where(aggregates["Nombre d'essai"] > 0))
+    percentage = percent_of(raw_average, aggregates["Three Stars"])
+    aggregates["Raw Average Score"] = raw_average
+    aggregates["Average Score"] = percentage.where(aggregates["Three Stars"].notna(), raw_average).fillna(0)
+
+    # temps anormaux (plus de 24 heures sur un niveau) : écartés des agrégats et signalés
+    time_spent, _, anomalies = calculate_time_per_level(df, by=keys)
+    for learner, scenario, mission, minutes in anomalies[keys + ["Time Spent (min)"]].itertuples(index=False):
+        logger.warning("Temps passé anormal", extra={"fields": {
+            "learner": learner, "scenario": scenario, "mission": mission, "minutes": minutes}})
+    aggregates = aggregates.merge(time_spent, on=keys, how="left")
+    return aggregates[AGGREGATE_COLUMNS]
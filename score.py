@@ -1,50 +1,79 @@
+import logging
 import os
+import re
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 
-def extract_scores(base_dir):
-    result = {}
+logger = logging.getLogger(__name__)
+
+
+# Configuration par scénario : quels fichiers sont des niveaux et comment nommer la mission.
+# Le nom de mission doit correspondre à l'extension "progress" des statements (ex. mission03).
+DEFAULT_SCENARIO = {"pattern": r"^Niveau(?P<num>[\w.]+)\.xml$", "mission": "mission{num}"}
+SCENARIOS = {
+    "Tutoriel": {"pattern": r"^(?P<name>.+)\.xml$", "mission": "{name}"},
+    "ELS": {"pattern": r"^(?P<name>.+)\.xml$", "mission": "{name}"},
+    "RonDoor_Scenario": {"pattern": r"^(?P<name>.+)\.xml$", "mission": "{name}"},
+}
+
+# en dessous de ce nombre de fichiers, lancer un pool de processus coûte plus cher que de parser
+PARALLEL_THRESHOLD = 2000
 
-    # Parcourir tous les dossiers dans le répertoire principal
-    for folder in os.listdir(base_dir):
+
+def scenario_config(folder):
+    return {**DEFAULT_SCENARIO, **SCENARIOS.get(folder, {})}
+
+
+def scenario_files(base_dir):
+    # (scénario, mission, chemin) pour chaque niveau de chaque dossier de scénario
+    for folder in sorted(os.listdir(base_dir)):
         folder_path = os.path.join(base_dir, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        config = scenario_config(folder)
+        pattern = re.compile(config["pattern"])
+        for file in sorted(os.listdir(folder_path)):
+            match = pattern.match(file)
+            if match:
+                yield folder, config["mission"].format(**match.groupdict()), os.path.join(folder_path, file)
 
-        # Vérifier si c'est un dossier et ignorer les dossiers spécifiques
-        if os.path.isdir(folder_path) and folder not in ["RonDoor_Scenario", "Selectionneur", "Tutoriel", "ELS"]:
-            folder_scores = {}
-
-            # Parcourir les fichiers dans le dossier
-            for file in os.listdir(folder_path):
-                if file.endswith(".xml"):
-                    file_path = os.path.join(folder_path, file)
-
-                    # Extraire le score max du fichier XML
-                    try:
-                        tree = ET.parse(file_path)
-                        root = tree.getroot()
-
-                        # Rechercher l'élément <score>
-                        score_element = root.find(".//score")
-                        if score_element is not None:
-                            three_stars = score_element.get("threeStars")
-                            if three_stars is not None:
-                                # Enregistrer le score max dans le dictionnaire
-                                mission_name = os.path.splitext(file)[0].replace("Niveau", "mission")
-                                folder_scores[mission_name] = int(three_stars)
-                    except ET.ParseError:
-                        print(f"Erreur de parsing dans le fichier : {file_path}")
-
-            # Ajouter les scores du dossier au résultat principal
-            result[folder] = folder_scores
 
-    return result
+def map_files(function, paths, workers=None, parallel_threshold=PARALLEL_THRESHOLD):
+    # répartit les fichiers sur un pool de processus pour les gros packs de niveaux
+    if len(paths) < parallel_threshold:
+        return [function(path) for path in paths]
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(function, paths, chunksize=max(1, len(paths) // (4 * workers))))
 
-# Exemple d'utilisation
-base_directory = "Levels"
-scores_max = extract_scores(base_directory)
-#print(scores_max)
 
-# Afficher les résultats
-# for folder, score_dict in scores.items():
-#     print(f"Dossier: {folder}")
-#     for mission, score in score_dict.items():
-#         print(f"  {mission}: {score}")
+def read_score(path):
+    # iterparse : on s'arrête dès que <score> est ouvert, sans construire tout l'arbre
+    try:
+        with open(path, "rb") as f:
+            for _, element in ET.iterparse(f, events=("start",)):
+                if element.tag == "score":
+                    return {key: int(value) for key, value in element.attrib.items() if key in ("threeStars", "twoStars")}
+    except ET.ParseError:
+        logger.warning("Erreur de parsing du niveau", extra={"fields": {"path": path}})
+    except ValueError:
+        logger.warning("Score invalide", extra={"fields": {"path": path}})
+    return None
+
+
+def extract_scores(base_dir, key="threeStars", workers=None, parallel_threshold=PARALLEL_THRESHOLD):
+    result = {}
+    levels = []
+
+    # Parcourir tous les dossiers de scénario dans le répertoire principal
+    for folder, mission, path in scenario_files(base_dir):
+        result.setdefault(folder, {})
+        levels.append((folder, mission, path))
+
+    scores = map_files(read_score, [path for _, _, path in levels], workers, parallel_threshold)
+
+    for (folder, mission, _), score in zip(levels, scores):
+        if score is not None and key in score:
+            result[folder][mission] = score[key]
+
+    return result
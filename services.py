@@ -0,0 +1,202 @@
+import os
+from functools import cached_property
+
+from cache import make_cache
+from metrics import cache_requests, configure_logging, registry, span
+
+
+# Dépendances de l'application (index des niveaux, client LRS, stockage local, caches) créées au
+# premier usage : importer ou créer l'application ne charge ni pandas, ni plotly, ni requests, et
+# les niveaux ne sont indexés qu'à la première connexion.
+
+DEFAULT_CONFIG = {
+    "cache_dir": os.environ.get("DASHBOARD_CACHE_DIR", ".cache"),
+    "cache_backend": os.environ.get("DASHBOARD_CACHE", "sqlite"),
+    "store_path": None,  # None : DASHBOARD_STORE ou .cache/statements.sqlite
+    "lrs_endpoint": None,  # None : client LRS par défaut (LRS_ENDPOINT)
+    "scenario": "Infiltration",
+}
+
+
+class Services:
+    def __init__(self, config=None, lrs_client=None, level_index=None):
+        # lrs_client (ex. LRSClient vers un faux LRS) et level_index peuvent être injectés
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        if lrs_client is not None:
+            self.lrs_client = lrs_client
+        if level_index is not None:
+            self.level_index = level_index
+
+    def setup_process(self):
+        # journaux et mesures communes aux workers et aux processus des callbacks de fond
+        configure_logging(self.config.get("log_level", "INFO"))
+        registry.share(os.path.join(self.config["cache_dir"], "metrics.sqlite"))
+
+    def __getstate__(self):
+        # envoyé aux processus des callbacks de fond : connexions SQLite et caches sont rouverts sur place
+        keep = ("config", "level_index", "thresholds", "lrs_client")
+        return {name: value for name, value in self.__dict__.items() if name in keep}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.setup_process()
+
+    @cached_property
+    def level_index(self):
+        # index précompilé des niveaux (les corrections manuelles sont dans level_overrides.json)
+        from level_index import load_index
+        return load_index()
+
+    @cached_property
+    def thresholds(self):
+        # seuils deux et trois étoiles par (scénario, mission) ; config["scenario"] ne sert qu'aux
+        # statements qui n'indiquent pas leur scénario
+        from normalization import threshold_table
+        return threshold_table(self.level_index)
+
+    @cached_property
+    def level_features(self):
+        # structure de chaque niveau (blocs autorisés, carte, pièces) pour la vue parcours
+        from analytics import level_features
+        return level_features(self.level_index)
+
+    @cached_property
+    def lrs_client(self):
+        import lrs
+        if self.config["lrs_endpoint"]:
+            return lrs.LRSClient(endpoint=self.config["lrs_endpoint"])
+        return lrs.default_client
+
+    @cached_property
+    def statement_store(self):
+        # statements déjà reçus du LRS : seuls les nouveaux sont redemandés et parsés
+        from store import STORE_PATH, StatementStore
+        return StatementStore(self.config["store_path"] or STORE_PATH, thresholds=self.thresholds,
+                              default_scenario=self.config["scenario"])
+
+    def cache(self, name):
+        # les synchronisations tournent dans des processus de fond : les caches doivent être partagés (SQLite)
+        return make_cache(name, backend=self.config["cache_backend"], directory=self.config["cache_dir"], shared=True)
+
+    @cached_property
+    def learner_cache(self):
+        return self.cache("learners")
+
+    @cached_property
+    def score_table_cache(self):
+        # lignes du tableau des scores par (apprenant, mission), paginées et triées côté serveur
+        return self.cache("score_tables")
+
+    @cached_property
+    def figure_cache(self):
+        # figures des apprenants déjà sérialisées, par empreinte des agrégats
+        return self.cache("figures")
+
+    def fetch_learner(self, identifier, progress=None):
+        # nouveaux statements de l'apprenant depuis la dernière synchronisation (ordre du LRS)
+        since = self.statement_store.last_stored(identifier)
+        statements = []
+        with span("fetch", learner=identifier):
+            for number, page in enumerate(self.lrs_client.iter_pages(identifier, since=since), start=1):
+                if progress:
+                    progress(f"Récupération de la page {number}…")
+                statements.extend(page)
+        return statements
+
+    def sync_learner(self, identifier, progress=None):
+        # progress(message) : état affiché sur la page de connexion pendant la synchronisation
+        statements = self.fetch_learner(identifier, progress)
+        if progress:
+            progress(f"Analyse de {len(statements)} nouveaux statements…")
+        return self.statement_store.ingest(identifier, statements)
+
+    def cached_learner_aggregates(self, identifier):
+        # agrégats en cache, ou None : aucune synchronisation
+        aggregates = self.learner_cache.get(identifier.strip())
+        cache_requests.inc(["learners", "miss" if aggregates is None else "hit"])
+        return aggregates
+
+    def sync_learner_aggregates(self, identifier, progress=None):
+        # synchronisation LRS puis relecture des agrégats, remis en cache
+        identifier = identifier.strip()
+        self.sync_learner(identifier, progress)
+        with span("store_read", learner=identifier):
+            aggregates = self.statement_store.aggregates(learners=[identifier])
+        # pas de résultat vide en cache : un apprenant qui commence à jouer est vu dès la connexion suivante
+        if not aggregates.empty:
+            self.learner_cache.set(identifier, aggregates)
+        return aggregates
+
+    def load_cohort_aggregates(self, identifiers, progress=None):
+        # agrégats d'une classe et identifiants sans données ; les apprenants absents du cache sont
+        # récupérés en parallèle (réseau) puis analysés et agrégés en un seul lot
+        from cohort import combine_aggregates, fetch_cohort
+
+        cached = {identifier: self.cached_learner_aggregates(identifier) for identifier in identifiers}
+        missing = [identifier for identifier, aggregates in cached.items() if aggregates is None]
+        failed = set()
+        if missing:
+            if progress:
+                progress(f"Récupération de {len(missing)} apprenant(s)…")
+            statements, errors = fetch_cohort(missing, self.fetch_learner)
+            failed = set(errors)
+            if progress:
+                progress(f"Analyse de {sum(map(len, statements.values()))} nouveaux statements…")
+            # les apprenants aux statements illisibles sont écartés du lot (voir ingest_many)
+            ingested = self.statement_store.ingest_many(statements)
+            failed |= set(statements) - set(ingested)
+            with span("store_read", learners=len(ingested)):
+                aggregates = self.statement_store.aggregates(learners=list(ingested))
+            by_learner = dict(list(aggregates.groupby("Learner", sort=False)))
+            for identifier in ingested:
+                cached[identifier] = by_learner.get(identifier, aggregates.iloc[:0]).reset_index(drop=True)
+                if not cached[identifier].empty:
+                    self.learner_cache.set(identifier, cached[identifier])
+
+        errors = [identifier for identifier in identifiers if identifier in failed or cached[identifier].empty]
+        return combine_aggregates([cached[identifier] for identifier in identifiers if identifier not in errors]), errors
+
+    def load_score_rows(self, identifier, selected_mission):
+        # selected_mission : clé "scénario/mission" du menu des missions, ou None
+        from normalization import split_mission_key
+        from views import score_table_rows
+
+        # la clé suit la dernière synchronisation : une nouvelle session invalide les pages en cache
+        key = f"{identifier}|{selected_mission or ''}|{self.statement_store.last_stored(identifier)}"
+        rows = self.score_table_cache.get(key)
+        cache_requests.inc(["score_tables", "miss" if rows is None else "hit"])
+        if rows is None:
+            # seules les lignes de la mission choisie sont lues dans le stockage local (tous scénarios :
+            # les statements sans scénario prennent celui de leur mission)
+            missions = [split_mission_key(selected_mission)[1]] if selected_mission else None
+            with span("store_read", learner=identifier):
+                df = self.statement_store.load(learners=[identifier], missions=missions,
+                                               columns=["Score", "Mission Level", "Scenario"])
+            rows = score_table_rows(df, selected_mission, self.thresholds, self.config["scenario"])
+            self.score_table_cache.set(key, rows)
+        return rows
+
+    def learner_data(self, identifier, aggregates):
+        # contenu de learner-data : tout ce que le navigateur affiche sans revenir au serveur
+        from figures import learner_figures
+        from normalization import ordered_mission_keys
+        from views import build_table_views
+
+        # figures mémorisées par empreinte des agrégats : rien n'est reconstruit si les données n'ont pas changé
+        with span("figures", learner=identifier):
+            figures = learner_figures(aggregates, self.figure_cache)
+        rows = self.load_score_rows(identifier, None)
+        with span("table", learner=identifier, rows=len(rows)):
+            tables = build_table_views(rows, aggregates)
+        return {"figures": figures, "missions": ordered_mission_keys(aggregates), "tables": tables}
+
+    def learning_path(self, scenario, learners=None):
+        # figures de la vue parcours ; learners=None : tous les apprenants du stockage local (table précalculée)
+        from analytics import learning_path
+        from figures import learning_path_figures
+
+        with span("store_read", learners=len(learners) if learners else "all"):
+            stats = self.statement_store.mission_stats(learners=learners)
+        path = learning_path(stats, self.level_features, scenario)
+        with span("figures", scenario=scenario):
+            return learning_path_figures(path, self.figure_cache)
@@ -0,0 +1,417 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import pandas as pd
+
+from cache import thread_connection
+from metrics import span
+from normalization import DEFAULT_SCENARIO
+from processing import AGGREGATE_COLUMNS, STATEMENT_COLUMNS, compact_frame, mission_aggregates, statements_frame
+
+logger = logging.getLogger(__name__)
+
+# Stockage local des statements déjà parsés (SQLite, une ligne par statement).
+# Les tables sont indexées par (apprenant, mission) et (scénario, mission) : les vues ne lisent
+# que les lignes et colonnes demandées au lieu de reparser tout le JSON du LRS.
+
+STORE_PATH = os.environ.get("DASHBOARD_STORE", os.path.join(".cache", "statements.sqlite"))
+
+# colonne du DataFrame -> colonne SQLite
+COLUMNS = {
+    "Learner": "learner",
+    "Id": "id",
+    "Stored": "stored",
+    "Timestamp": "timestamp",
+    "Verb": "verb",
+    "Actor": "actor",
+    "Object": "object",
+    "Score": "score",
+    "Mission Level": "mission_level",
+    "Scenario": "scenario",
+}
+
+# agrégats matérialisés par (apprenant, scénario, mission)
+AGGREGATES = {
+    "Learner": "learner",
+    "Mission Level": "mission_level",
+    "Scenario": "scenario",
+    "Statements": "statements",
+    "Completed": "completed",
+    "Failed": "failed",
+    "Nombre d'essai": "attempts",
+    "Best Score": "best_score",
+    "Mean Score": "mean_score",
+    "Min Score": "min_score",
+    "Score Sum": "score_sum",
+    "Raw Average Score": "raw_average_score",
+    "Average Score": "average_score",
+    "Time Spent (min)": "time_spent",
+    "Two Stars": "two_stars",
+    "Three Stars": "three_stars",
+    "Position": "position",
+}
+
+# paliers du tunnel de relance : apprenants ayant fait au moins n essais (réussis ou échoués)
+RETRY_STEPS = (1, 2, 3, 5)
+
+# statistiques par (scénario, mission) sur tous les apprenants, recalculées depuis learner_missions pour
+# les seules missions des apprenants synchronisés. Colonne du DataFrame -> (colonne SQLite, expression).
+# Un apprenant abandonne une mission s'il ne l'a jamais réussie et n'a rien ouvert au-delà dans le même
+# scénario (missions dans l'ordre de l'index des niveaux ; un niveau hors index ne compte pas).
+MISSION_STATS = {
+    "Learners": ("learners", "COUNT(*)"),
+    **{f"Tries {step}+": (f"tries_{step}", f"SUM(completed + COALESCE(failed, 0) >= {step})") for step in RETRY_STEPS},
+    "Completed Learners": ("completed_learners", "SUM(completed > 0)"),
+    "Two Stars Learners": ("two_stars_learners", "COALESCE(SUM(best_score >= two_stars), 0)"),
+    "Three Stars Learners": ("three_stars_learners", "COALESCE(SUM(best_score >= three_stars), 0)"),
+    "Dropped Learners": ("dropped_learners", "COALESCE(SUM(completed = 0 AND position = (SELECT MAX(other.position)"
+                                             " FROM learner_missions other WHERE other.learner = learner_missions.learner"
+                                             " AND other.scenario = learner_missions.scenario)), 0)"),
+    "Tries": ("tries", "SUM(completed + COALESCE(failed, 0))"),
+    "Scored Learners": ("scored_learners", "SUM(attempts > 0)"),
+    "Score Sum": ("score_sum", "TOTAL(CASE WHEN attempts > 0 THEN average_score END)"),
+    "Time Spent (min)": ("time_spent", "TOTAL(time_spent)"),
+    "Timed Learners": ("timed_learners", "COUNT(time_spent)"),
+}
+MISSION_STATS_COLUMNS = ["Scenario", "Mission Level"] + list(MISSION_STATS)
+MISSION_STATS_SELECT = (
+    "SELECT scenario, mission_level, " + ", ".join(expression for _, expression in MISSION_STATS.values())
+    + " FROM learner_missions"
+)
+
+
+STATEMENTS_TABLE = (
+    "CREATE TABLE IF NOT EXISTS {name} ("
+    " id TEXT NOT NULL PRIMARY KEY, learner TEXT NOT NULL, stored TEXT, timestamp INTEGER,"
+    " verb TEXT, actor TEXT, object TEXT, score REAL, mission_level TEXT, scenario TEXT)"
+)
+
+
+def content_id(learner, stored, timestamp, verb, actor, statement_object, score):
+    # id stable d'un statement sans id (exports JSONL) : empreinte des champs stockés
+    content = json.dumps([learner, stored, timestamp, verb, actor, statement_object, score])
+    return "sha1:" + hashlib.sha1(content.encode()).hexdigest()
+
+
+def sql_values(series):
+    # valeurs Python pour SQLite (catégories -> str, float32 -> float), None pour les valeurs manquantes
+    return series.astype(object).where(series.notna(), None)
+
+
+def where_clause(**filters):
+    # filters : colonne -> valeurs acceptées (None = pas de filtre)
+    conditions, params = [], []
+    for column, values in filters.items():
+        if values is not None:
+            values = list(values)
+            conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+class StatementStore:
+    def __init__(self, path=STORE_PATH, thresholds=None, default_scenario=DEFAULT_SCENARIO):
+        # thresholds = normalization.threshold_table(index), seuils par (scénario, mission) des agrégats ;
+        # default_scenario : scénario des statements qui n'en indiquent pas
+        self.path = path
+        self.thresholds = thresholds
+        self.default_scenario = default_scenario
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(STATEMENTS_TABLE.format(name="statements"))
+        # stockages où id pouvait être NULL : les statements sans id, réinsérés à chaque import, sont
+        # dédoublonnés sur leur contenu avant de recalculer les agrégats
+        id_nullable = any(row[1] == "id" and not row[3] for row in conn.execute("PRAGMA table_info(statements)"))
+        if id_nullable:
+            self._rebuild_statements(conn)
+        conn.execute("CREATE INDEX IF NOT EXISTS statements_learner ON statements (learner, mission_level, stored)")
+        conn.execute("CREATE INDEX IF NOT EXISTS statements_mission ON statements (scenario, mission_level, learner)")
+        conn.execute("CREATE TABLE IF NOT EXISTS sync_state (learner TEXT PRIMARY KEY, stored TEXT)")
+        # agrégats indexés par (apprenant, mission) avant la prise en compte du scénario : la table ne
+        # dépend que des statements, elle est recréée puis recalculée
+        primary_key = [row[1] for row in conn.execute("PRAGMA table_info(learner_missions)") if row[5]]
+        rekeyed = bool(primary_key) and "scenario" not in primary_key
+        if rekeyed:
+            conn.execute("DROP TABLE learner_missions")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS learner_missions ("
+            " learner TEXT NOT NULL, scenario TEXT NOT NULL, mission_level TEXT NOT NULL, statements INTEGER,"
+            " completed INTEGER, failed INTEGER, attempts INTEGER, best_score REAL, mean_score REAL, min_score REAL,"
+            " score_sum REAL, raw_average_score REAL, average_score REAL, time_spent REAL,"
+            " two_stars REAL, three_stars REAL, position INTEGER, PRIMARY KEY (learner, scenario, mission_level))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS learner_missions_mission ON learner_missions (scenario, mission_level)")
+        stats_created = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'mission_stats'").fetchone() is None
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS mission_stats (scenario TEXT NOT NULL, mission_level TEXT NOT NULL, "
+            + ", ".join(f"{column} REAL" for column, _ in MISSION_STATS.values())
+            + ", PRIMARY KEY (scenario, mission_level))"
+        )
+        # stockages créés avant les seuils par scénario, le compte des échecs ou le rang des niveaux :
+        # colonnes ajoutées puis agrégats recalculés
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(learner_missions)")}
+        added = {"two_stars": "REAL", "three_stars": "REAL", "failed": "INTEGER", "position": "INTEGER"}
+        missing = [column for column in added if column not in existing]
+        for column in missing:
+            conn.execute(f"ALTER TABLE learner_missions ADD COLUMN {column} {added[column]}")
+        if missing or id_nullable or rekeyed:
+            self.refresh_aggregates()
+        elif stats_created:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._refresh_mission_stats(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _connect(self):
+        return thread_connection(self._local, self.path)
+
+    def _rebuild_statements(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(STATEMENTS_TABLE.format(name="statements_rebuilt"))
+            # colonnes dans l'ordre de l'import : id, learner, stored, timestamp, ... scenario
+            columns = ", ".join(["id", "learner"] + [COLUMNS[column] for column in COLUMNS if column not in ("Id", "Learner")])
+            rows = conn.execute(f"SELECT {columns} FROM statements ORDER BY rowid").fetchall()
+            # même id dérivé qu'à l'import : les prochains imports du même fichier ne dupliquent rien
+            conn.executemany(
+                f"INSERT OR IGNORE INTO statements_rebuilt ({columns}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                [(row[0] or content_id(row[1], *row[2:8]),) + row[1:] for row in rows],
+            )
+            conn.execute("DROP TABLE statements")
+            conn.execute("ALTER TABLE statements_rebuilt RENAME TO statements")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def last_stored(self, learner):
+        row = self._connect().execute("SELECT stored FROM sync_state WHERE learner = ?", (learner,)).fetchone()
+        return row[0] if row else None
+
+    def ingest(self, learner, statements):
+        # statements dans l'ordre du LRS (du plus récent au plus ancien) ; renvoie le nombre de lignes ajoutées
+        inserted = self.ingest_many({learner: statements})
+        if learner not in inserted:
+            raise ValueError(f"Statements illisibles pour {learner}")
+        return inserted[learner]
+
+    def ingest_many(self, statements):
+        # {apprenant: statements dans l'ordre du LRS} : une seule analyse, une seule transaction et un seul
+        # recalcul des agrégats pour tous les apprenants (ex. une classe) ; renvoie {apprenant: lignes ajoutées}
+        # sans les apprenants dont les statements ne peuvent pas être analysés (avertissement journalisé)
+        learners = list(statements)
+        sizes = [len(statements[learner]) for learner in learners]
+        inserted = dict.fromkeys(learners, 0)
+        try:
+            with span("parse", learners=len(learners), statements=sum(sizes)):
+                df = statements_frame([statement for learner in learners for statement in statements[learner]],
+                                      extra_columns=("Id", "Stored"), sizes=sizes if len(learners) > 1 else None)
+        except (ValueError, TypeError):
+            # un apprenant illisible n'empêche pas l'import des autres
+            readable = {}
+            for learner in learners:
+                try:
+                    statements_frame(statements[learner], extra_columns=("Id", "Stored"))
+                except (ValueError, TypeError):
+                    logger.warning("Statements illisibles", exc_info=True, extra={"fields": {"learner": learner}})
+                else:
+                    readable[learner] = statements[learner]
+            if len(readable) == len(learners):
+                raise  # erreur du lot lui-même, pas d'un apprenant
+            return self.ingest_many(readable) if readable else {}
+        if df.empty:
+            return inserted
+
+        # timestamps en nanosecondes UTC (int64), NULL si absents
+        nanoseconds = pd.Series(df["Timestamp"].array.asi8, index=df.index).astype(object)
+        timestamps = nanoseconds.where(df["Timestamp"].notna(), None)
+        rows = [
+            (statement_id or content_id(learner, *values[:6]), learner, *values)
+            for learner, statement_id, *values in zip(
+                (learner for learner, size in zip(learners, sizes) for _ in range(size)),
+                df["Id"], df["Stored"], timestamps,
+                *(sql_values(df[column]) for column in ("Verb", "Actor", "Object")),
+                sql_values(df["Score"].astype("float64")),
+                sql_values(df["Mission Level"]), sql_values(df["Scenario"]),
+            )
+        ]
+
+        touched = set(df["Mission Level"].dropna())
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            end = 0
+            for learner, size in zip(learners, sizes):
+                start, end = end, end + size
+                if not size:
+                    continue
+                # les plus anciens statements sans niveau en tête de l'historique déjà stocké héritent du
+                # niveau et du scénario du plus ancien nouveau statement, comme si tout avait été parsé d'un bloc
+                oldest_level = df["Mission Level"].iloc[end - 1]
+                if oldest_level is not None and not pd.isna(oldest_level):
+                    oldest_scenario = df["Scenario"].iloc[end - 1]
+                    conn.execute(
+                        "UPDATE statements SET mission_level = ?, scenario = COALESCE(scenario, ?)"
+                        " WHERE learner = ? AND mission_level IS NULL"
+                        " AND stored > COALESCE((SELECT MAX(stored) FROM statements"
+                        " WHERE learner = ? AND mission_level IS NOT NULL), '')",
+                        (oldest_level, None if pd.isna(oldest_scenario) else oldest_scenario, learner, learner),
+                    )
+                    touched.add(oldest_level)
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO statements (id, learner, stored, timestamp, verb, actor, object, score,"
+                    " mission_level, scenario) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows[start:end],
+                )
+                inserted[learner] = conn.total_changes - before
+                newest = df["Stored"].iloc[start:end].dropna().max()
+                if isinstance(newest, str):
+                    conn.execute(
+                        "INSERT INTO sync_state (learner, stored) VALUES (?, ?)"
+                        " ON CONFLICT (learner) DO UPDATE SET stored = MAX(stored, excluded.stored)",
+                        (learner, newest),
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        changed = [learner for learner in learners if inserted[learner]]
+        if changed:
+            with span("aggregate", learners=len(changed), missions=len(touched)):
+                self.refresh_aggregates(changed, touched)
+        return inserted
+
+    def refresh_aggregates(self, learners=None, missions=None):
+        # ne recalcule que les missions des apprenants touchées par de nouveaux statements
+        columns = ["Learner", "Timestamp", "Verb", "Score", "Mission Level", "Scenario"]
+        df = self.load(learners=learners, missions=missions, columns=columns)
+        aggregates = mission_aggregates(df, self.thresholds, self.default_scenario)
+        rows = [
+            tuple(None if pd.isna(value) else value for value in row)
+            for row in aggregates[list(AGGREGATES)].astype(object).itertuples(index=False)
+        ]
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # un apprenant peut changer de scénario sur une mission ou abandonner plus loin : on reprend
+            # toutes ses missions, avant et après réécriture (toute la table sans filtre d'apprenants)
+            touched = None if learners is None else self._learner_missions(conn, learners)
+            # les lignes recalculées remplacent toutes les anciennes (le scénario d'une mission peut changer)
+            where, params = where_clause(learner=learners, mission_level=missions)
+            conn.execute(f"DELETE FROM learner_missions{where}", params)
+            conn.executemany(
+                f"INSERT OR REPLACE INTO learner_missions ({', '.join(AGGREGATES.values())})"
+                f" VALUES ({', '.join('?' * len(AGGREGATES))})",
+                rows,
+            )
+            if touched is not None:
+                touched |= self._learner_missions(conn, learners)
+            self._refresh_mission_stats(conn, touched)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _learner_missions(self, conn, learners):
+        # couples (scénario, mission) des apprenants donnés (tous si None)
+        where, params = where_clause(learner=learners)
+        return set(conn.execute(f"SELECT DISTINCT scenario, mission_level FROM learner_missions{where}", params))
+
+    def _refresh_mission_stats(self, conn, missions=None):
+        # missions : couples (scénario, mission) à recalculer, None pour toute la table
+        columns = ", ".join(["scenario", "mission_level"] + [column for column, _ in MISSION_STATS.values()])
+        if missions is None:
+            conn.execute("DELETE FROM mission_stats")
+            conn.execute(f"INSERT INTO mission_stats ({columns}) {MISSION_STATS_SELECT}"
+                         " GROUP BY scenario, mission_level")
+            return
+        conn.executemany("DELETE FROM mission_stats WHERE scenario = ? AND mission_level = ?", missions)
+        conn.executemany(
+            f"INSERT INTO mission_stats ({columns}) {MISSION_STATS_SELECT}"
+            " WHERE scenario = ? AND mission_level = ? GROUP BY scenario, mission_level",
+            missions,
+        )
+
+    def aggregates(self, learners=None, missions=None):
+        where, params = where_clause(learner=learners, mission_level=missions)
+        query = f"SELECT {', '.join(AGGREGATES.values())} FROM learner_missions{where}"
+        query += " ORDER BY learner, scenario, mission_level"
+        rows = self._connect().execute(query, params).fetchall()
+        df = pd.DataFrame.from_records(rows, columns=list(AGGREGATES))
+        float_columns = ["Best Score", "Mean Score", "Min Score", "Score Sum", "Raw Average Score",
+                         "Average Score", "Time Spent (min)", "Two Stars", "Three Stars", "Position"]
+        df[float_columns] = df[float_columns].astype("float64")
+        return df[AGGREGATE_COLUMNS]
+
+    def mission_stats(self, learners=None, scenarios=None):
+        # table précalculée pour tous les apprenants ; pour une classe (learners), même calcul à la
+        # volée sur ses lignes de learner_missions
+        if learners is None:
+            where, params = where_clause(scenario=scenarios)
+            columns = ", ".join(column for column, _ in MISSION_STATS.values())
+            query = f"SELECT scenario, mission_level, {columns} FROM mission_stats{where}"
+        else:
+            where, params = where_clause(learner=learners, scenario=scenarios)
+            query = f"{MISSION_STATS_SELECT}{where} GROUP BY scenario, mission_level"
+        rows = self._connect().execute(query + " ORDER BY scenario, mission_level", params).fetchall()
+        df = pd.DataFrame.from_records(rows, columns=MISSION_STATS_COLUMNS)
+        totals = ["Score Sum", "Time Spent (min)"]
+        counts = [column for column in MISSION_STATS if column not in totals]
+        return df.astype({**{column: "float64" for column in totals}, **{column: "int64" for column in counts}})
+
+    def load(self, learners=None, missions=None, scenarios=None, columns=None):
+        # les filtres sont appliqués par SQLite (index) : seules les lignes utiles sont lues
+        columns = list(columns or STATEMENT_COLUMNS)
+        where, params = where_clause(learner=learners, mission_level=missions, scenario=scenarios)
+        query = f"SELECT {', '.join(COLUMNS[column] for column in columns)} FROM statements{where}"
+        query += " ORDER BY learner, stored DESC, rowid"
+
+        rows = self._connect().execute(query, params).fetchall()
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        if "Timestamp" in df:
+            df["Timestamp"] = pd.to_datetime(df["Timestamp"].astype("Int64"), unit="ns", utc=True)
+        return compact_frame(df)
+
+
+def statement_learner(statement):
+    actor = statement.get("actor", {})
+    return actor.get("account", {}).get("name") or actor.get("name")
+
+
+def ingest_jsonl(store, path):
+    # charge un export JSONL (un statement par ligne, .gz accepté) en le regroupant par apprenant
+    opener = gzip.open if path.endswith(".gz") else open
+    by_learner = {}
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                statement = json.loads(line)
+                by_learner.setdefault(statement_learner(statement), []).append(statement)
+
+    for statements in by_learner.values():
+        statements.sort(key=lambda statement: statement.get("stored", ""), reverse=True)
+    return sum(store.ingest_many(by_learner).values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importe des statements xAPI (JSONL) dans le stockage local")
+    parser.add_argument("statements", help="fichier .jsonl (ou .jsonl.gz), un statement par ligne")
+    parser.add_argument("--store", default=STORE_PATH)
+    args = parser.parse_args()
+
+    from level_index import load_index
+    from normalization import threshold_table
+
+    store = StatementStore(args.store, thresholds=threshold_table(load_index()))
+    count = ingest_jsonl(store, args.statements)
+    print(f"{count} statements importés dans {args.store}")
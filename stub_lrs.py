@@ -0,0 +1,143 @@
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+# Faux serveur xAPI local (agent, limit, since, lien "more", gzip) pour développer
+# et tester le client LRS sans solliciter https://lrsels.lip6.fr. Il sert aussi les pages
+# enregistrées par LRSClient(record_path=...), avec une latence réglable pour les tests de charge.
+
+
+def agent_name(agent):
+    try:
+        return json.loads(agent)["account"]["name"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class StubLRS:
+    def __init__(self, statements=(), host="127.0.0.1", port=0, page_limit=500, latency=0.0, jitter=0.0):
+        # latency, jitter : délai ajouté à chaque réponse (secondes), latency ± jitter tiré au hasard
+        self.page_limit = page_limit
+        self.latency = latency
+        self.jitter = jitter
+        self.request_count = 0
+        self.by_agent = {}
+        self.add(statements)
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/data/xAPI/statements"
+
+    def add(self, statements):
+        for statement in statements:
+            name = statement.get("actor", {}).get("account", {}).get("name") or statement.get("actor", {}).get("name")
+            self.by_agent.setdefault(name, []).append(statement)
+        # comme un vrai LRS : du plus récent au plus ancien selon "stored"
+        for agent_statements in self.by_agent.values():
+            agent_statements.sort(key=lambda statement: statement.get("stored", ""), reverse=True)
+
+    def query(self, params):
+        statements = self.by_agent.get(agent_name(params.get("agent", "")), [])
+        since = params.get("since")
+        if since:
+            statements = [statement for statement in statements if statement.get("stored", "") > since]
+        limit = min(int(params.get("limit") or self.page_limit), self.page_limit)
+        offset = int(params.get("offset", 0))
+        page = statements[offset:offset + limit]
+        more = ""
+        if offset + limit < len(statements):
+            more_params = dict(params, offset=offset + limit, limit=limit)
+            more = "/data/xAPI/statements?" + urlencode(more_params)
+        return {"statements": page, "more": more}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != "/data/xAPI/statements":
+                    self.send_error(404)
+                    return
+                stub.request_count += 1
+                delay = stub.latency + random.uniform(-stub.jitter, stub.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                body = json.dumps(stub.query(params)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("X-Experience-API-Version", "1.0.3")
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def load_jsonl(path):
+    # un statement par ligne, ou un enregistrement de LRSClient (une page par ligne)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or "statements" not in lines[0]:
+        return lines
+
+    # pages enregistrées : une synchronisation complète puis des synchronisations "since" se recoupent ;
+    # la page renvoyée au client est redécoupée par query(), quelle que soit la date "since" demandée
+    statements, seen = [], set()
+    for record in lines:
+        for statement in record["statements"]:
+            statement_id = statement.get("id")
+            if statement_id is None or statement_id not in seen:
+                seen.add(statement_id)
+                statements.append(statement)
+    return statements
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Faux LRS xAPI servant des statements depuis un fichier JSONL")
+    parser.add_argument("statements", help="fichier .jsonl (ou .jsonl.gz) : un statement par ligne ou "
+                                           "pages enregistrées avec LRS_RECORD / python lrs.py --record")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--page-limit", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="délai par requête (secondes)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="variation aléatoire du délai (secondes)")
+    args = parser.parse_args()
+
+    stub = StubLRS(load_jsonl(args.statements), host=args.host, port=args.port, page_limit=args.page_limit,
+                   latency=args.latency, jitter=args.jitter)
+    print(f"LRS_ENDPOINT={stub.endpoint}")
+    stub.server.serve_forever()
@@ -0,0 +1,34 @@
+import math
+
+import pandas as pd
+
+from normalization import ordered_mission_keys, threshold_table
+
+
+def test_threshold_table_fallbacks():
+    table = threshold_table({"levels": {"Infiltration": {
+        "mission01": {"twoStars": 3000, "threeStars": 6000, "position": 1},
+        # deux étoiles absent, puis au-dessus du trois étoiles : 70 % du trois étoiles
+        "mission02": {"threeStars": 5000, "position": 2},
+        "mission03": {"twoStars": 9000, "threeStars": 4000, "position": 3},
+        # 0 = seuil non renseigné
+        "mission04": {"twoStars": 0, "threeStars": 0},
+    }}})
+    rows = table.loc["Infiltration"]
+    assert rows.loc["mission01", ["Two Stars", "Three Stars"]].tolist() == [3000, 6000]
+    assert rows.loc["mission02", ["Two Stars", "Three Stars"]].tolist() == [3500, 5000]
+    assert rows.loc["mission03", ["Two Stars", "Three Stars"]].tolist() == [2800, 4000]
+    assert rows.loc["mission04"].isna().all()
+    assert rows["Position"].tolist()[:3] == [1, 2, 3]
+
+
+def test_ordered_mission_keys_follow_level_position():
+    aggregates = pd.DataFrame({
+        "Scenario": ["Tutoriel", "Tutoriel", "Infiltration", "Infiltration", "Infiltration"],
+        "Mission Level": ["CreateScript", "Tutoriel", "mission10", "mission09", "missionX"],
+        "Position": [3, 1, 10, 9, math.nan],
+    })
+    assert ordered_mission_keys(aggregates) == [
+        "Infiltration/mission09", "Infiltration/mission10", "Infiltration/missionX",
+        "Tutoriel/Tutoriel", "Tutoriel/CreateScript",
+    ]
@@ -0,0 +1,131 @@
+import copy
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_statements
+from normalization import threshold_table
+from store import StatementStore
+
+
+# Stockage local : import par lot (ingest_many) identique à l'import apprenant par apprenant,
+# migration d'un stockage créé par une version précédente.
+
+INDEX = {"levels": {
+    scenario: {
+        f"mission{number:02d}": {"twoStars": 3000, "threeStars": 6000, "position": number}
+        for number in range(1, 5)
+    }
+    for scenario in ("Explorateur", "Infiltration")
+}}
+
+# schéma d'avant les identifiants NOT NULL, les agrégats par scénario et le rang des niveaux
+LEGACY_SCHEMA = [
+    "CREATE TABLE statements ("
+    " id TEXT PRIMARY KEY, learner TEXT NOT NULL, stored TEXT, timestamp INTEGER,"
+    " verb TEXT, actor TEXT, object TEXT, score REAL, mission_level TEXT, scenario TEXT)",
+    "CREATE TABLE sync_state (learner TEXT PRIMARY KEY, stored TEXT)",
+    "CREATE TABLE learner_missions ("
+    " learner TEXT NOT NULL, mission_level TEXT NOT NULL, scenario TEXT, statements INTEGER,"
+    " completed INTEGER, failed INTEGER, attempts INTEGER, best_score REAL, mean_score REAL, min_score REAL,"
+    " score_sum REAL, raw_average_score REAL, average_score REAL, time_spent REAL,"
+    " two_stars REAL, three_stars REAL, PRIMARY KEY (learner, mission_level))",
+]
+
+
+def by_learner(statements):
+    learners = {}
+    for statement in statements:
+        learners.setdefault(statement["actor"]["name"], []).append(statement)
+    return learners
+
+
+@pytest.fixture
+def statements():
+    # deux scénarios aux mêmes noms de missions ; chaque apprenant est dans l'ordre du LRS
+    learners = {}
+    for seed, scenario in enumerate(("Infiltration", "Explorateur")):
+        for learner, learner_statements in by_learner(
+                generate_statements(1200, learners=4, seed=seed, scenario=scenario, missions=4)).items():
+            for statement in learner_statements:
+                statement["id"] = f"{scenario}-{statement['id']}"
+            learners.setdefault(learner, []).extend(learner_statements)
+    for learner_statements in learners.values():
+        learner_statements.sort(key=lambda statement: statement["stored"], reverse=True)
+
+    first, second = list(learners)[:2]
+    # bloc qui commence sans niveau : rien ne doit être hérité de l'apprenant précédent
+    learners[second][0] = copy.deepcopy(learners[second][0])
+    learners[second][0]["object"]["definition"]["extensions"] = {}
+    # précisions différentes d'un statement à l'autre
+    learners[first][0]["timestamp"] = learners[first][0]["timestamp"].split(".")[0] + "Z"
+    return learners
+
+
+def open_store(path):
+    return StatementStore(str(path), thresholds=threshold_table(INDEX))
+
+
+def test_ingest_many_matches_per_learner(tmp_path, statements):
+    single, batch = open_store(tmp_path / "single.sqlite"), open_store(tmp_path / "batch.sqlite")
+    halves = [{learner: rows[len(rows) // 2:] for learner, rows in statements.items()},
+              {learner: rows[:len(rows) // 2] for learner, rows in statements.items()}]
+    for half in halves:
+        expected = {learner: single.ingest(learner, rows) for learner, rows in half.items()}
+        assert batch.ingest_many(half) == expected
+
+    pd.testing.assert_frame_equal(single.load(), batch.load())
+    pd.testing.assert_frame_equal(single.aggregates(), batch.aggregates())
+    pd.testing.assert_frame_equal(single.mission_stats(), batch.mission_stats())
+
+
+def test_same_mission_in_two_scenarios_is_kept_apart(tmp_path, statements):
+    store = open_store(tmp_path / "store.sqlite")
+    store.ingest_many(statements)
+    aggregates = store.aggregates()
+    assert not aggregates.duplicated(["Learner", "Scenario", "Mission Level"]).any()
+    assert set(aggregates["Scenario"]) == {"Explorateur", "Infiltration"}
+
+
+def test_unreadable_learner_is_left_out_of_the_batch(tmp_path, statements):
+    unreadable = list(statements)[-1]
+    statements[unreadable][3] = {**statements[unreadable][3], "timestamp": "pas une date"}
+    store = open_store(tmp_path / "store.sqlite")
+
+    inserted = store.ingest_many(statements)
+    assert set(inserted) == set(statements) - {unreadable}
+    assert unreadable not in set(store.aggregates()["Learner"])
+    with pytest.raises(ValueError):
+        store.ingest(unreadable, statements[unreadable])
+
+
+def test_legacy_store_is_migrated(tmp_path, statements):
+    # statements sans id : l'ancien schéma les gardait avec un id NULL
+    for learner_statements in statements.values():
+        for statement in learner_statements[::7]:
+            del statement["id"]
+    fresh = open_store(tmp_path / "fresh.sqlite")
+    fresh.ingest_many(statements)
+
+    legacy_path = tmp_path / "legacy.sqlite"
+    columns = "id, learner, stored, timestamp, verb, actor, object, score, mission_level, scenario"
+    rows = sqlite3.connect(tmp_path / "fresh.sqlite").execute(
+        f"SELECT {columns} FROM statements ORDER BY rowid").fetchall()
+    with sqlite3.connect(legacy_path) as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(statement)
+        conn.executemany(f"INSERT INTO statements ({columns}) VALUES ({', '.join('?' * 10)})",
+                         [(None if row[0].startswith("sha1:") else row[0],) + row[1:] for row in rows])
+        conn.execute("INSERT INTO sync_state SELECT learner, MAX(stored) FROM statements GROUP BY learner")
+
+    migrated = open_store(legacy_path)
+    pd.testing.assert_frame_equal(fresh.aggregates(), migrated.aggregates())
+    pd.testing.assert_frame_equal(fresh.mission_stats(), migrated.mission_stats())
+    conn = sqlite3.connect(legacy_path)
+    assert conn.execute("SELECT COUNT(*) FROM statements WHERE id IS NULL").fetchone() == (0,)
+    primary_key = [row[1] for row in conn.execute("PRAGMA table_info(learner_missions)") if row[5]]
+    assert primary_key == ["learner", "scenario", "mission_level"]
+
+    # ids dérivés stables : réimporter les mêmes statements n'ajoute rien
+    assert sum(migrated.ingest_many(statements).values()) == 0
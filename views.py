@@ -0,0 +1,120 @@
+from metrics import span
+
+
+# Données des vues de l'apprenant (tableaux, feedback) construites à partir du stockage local ;
+# le navigateur les reçoit dans learner-data ou page par page pour le tableau des scores.
+# Le module reste léger à importer (layout) : pandas n'arrive qu'avec les DataFrames.
+
+SCORE_PAGE_SIZE = 20
+
+
+def generate_feedback(scores, thresholds):
+    # étoiles pour toute une colonne de scores (thresholds = seuils alignés sur scores, cf. normalization)
+    from normalization import star_ratings
+    return star_ratings(scores, thresholds["Two Stars"], thresholds["Three Stars"])
+
+
+PENGUIN_FEEDBACK = {
+    "★ ★ ★": {
+        "comment": "Excellent travail ! Vous êtes un expert ! 🐧",
+        "image": "/assets/penguin_happy.png"
+    },
+    "★ ★ ☆": {
+        "comment": "Bon travail, mais vous pouvez encore progresser ! 🐧",
+        "image": "/assets/penguin_neutral.png"
+    },
+}
+
+
+def get_penguin_feedback(stars):
+    # Pas de score, score invalide ou une seule étoile
+    return PENGUIN_FEEDBACK.get(stars, {
+        "comment": "Ne vous découragez pas, vous y arriverez ! 🐧",
+        "image": "/assets/penguin_sad.png"
+    })
+
+
+def score_table_rows(df, selected_mission, thresholds, default_scenario=None):
+    # toutes les lignes du tableau des scores ; seules les pages demandées partent vers le navigateur
+    # thresholds = normalization.threshold_table(index) ; chaque essai est noté selon son scénario
+    # selected_mission : clé "scénario/mission" (normalization.mission_key) ou None
+    from normalization import DEFAULT_SCENARIO, row_scenarios, row_thresholds, split_mission_key
+
+    df = df.assign(Scenario=row_scenarios(df, default_scenario or DEFAULT_SCENARIO))
+    df = df.loc[df['Score'].notna() & (df['Score'] != 0), ["Mission Level", "Scenario", "Score"]]
+    df["Score"] = df["Score"].round(2)
+    df['Essai'] = (df.groupby(['Scenario', 'Mission Level'], observed=True).cumcount() + 1).astype("int32")
+
+    if selected_mission:
+        scenario, mission = split_mission_key(selected_mission)
+        df = df[(df["Scenario"] == scenario) & (df["Mission Level"] == mission)]
+
+    # colonne Feedback
+    df["Feedback"] = generate_feedback(df["Score"], row_thresholds(df, thresholds))
+    return df.reset_index(drop=True)
+
+
+def score_table_page(rows, page_current=0, sort_by=None, page_size=SCORE_PAGE_SIZE):
+    if sort_by:
+        rows = rows.sort_values(sort_by[0]['column_id'], ascending=sort_by[0]['direction'] == 'asc', kind="stable")
+    start = (page_current or 0) * page_size
+    with span("serialize", rows=min(page_size, max(len(rows) - start, 0))):
+        page = rows.iloc[start:start + page_size][["Essai", "Score", "Feedback"]]
+        page = page.astype({"Essai": object, "Score": "float64", "Feedback": object}).round({"Score": 2})
+        return page.to_dict('records')
+
+
+def table_view_data(rows, aggregates, selected_mission):
+    # statistiques lues dans les agrégats (apprenant, scénario, mission), seuils du scénario compris
+    from normalization import split_mission_key
+
+    three_stars = None
+    if selected_mission:
+        scenario, mission = split_mission_key(selected_mission)
+        aggregates = aggregates[(aggregates["Scenario"] == scenario) & (aggregates["Mission Level"] == mission)]
+        three_stars = aggregates["Three Stars"].max()
+    attempts = aggregates["Nombre d'essai"].sum()
+    best_score = round(aggregates["Best Score"].max(), 2)
+
+    stats_data = {
+        "Score le plus haut": (
+            three_stars
+            if three_stars is not None and three_stars >= best_score
+            else best_score
+        ),
+        "Score Moyen": (
+            round(aggregates["Score Sum"].sum() / attempts, 2) if attempts else None
+        ),
+        "Score le plus bas obtenu": (
+            round(aggregates["Min Score"].min(), 2) if attempts else None
+        )
+    }
+
+    # feedback du penguin
+    if not rows.empty:
+        penguin_feedback_data = get_penguin_feedback(rows["Feedback"].iloc[-1])
+    else:
+        penguin_feedback_data = {
+            "comment": "Aucun score disponible pour l'instant. Essayez une mission ! 🐧",
+            "image": "/assets/penguin_idle.png"
+        }
+
+    # seule la première page part avec la vue, les suivantes sont demandées à page_score_table
+    return {
+        "stats": [stats_data],
+        "scores": score_table_page(rows),
+        "page_count": max(1, -(-len(rows) // SCORE_PAGE_SIZE)),
+        "penguin": penguin_feedback_data,
+    }
+
+
+def build_table_views(rows, aggregates):
+    # une vue par clé de mission ("" = toutes les missions), à partir des lignes de toutes les missions
+    from normalization import mission_key
+
+    by_mission = dict(list(rows.groupby(["Scenario", "Mission Level"], sort=False, observed=True)))
+    views = {"": table_view_data(rows, aggregates, None)}
+    for scenario, mission in zip(aggregates["Scenario"], aggregates["Mission Level"]):
+        mission_rows = by_mission.get((scenario, mission), rows.iloc[:0]).reset_index(drop=True)
+        views[mission_key(scenario, mission)] = table_view_data(mission_rows, aggregates, mission_key(scenario, mission))
+    return views